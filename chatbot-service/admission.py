@@ -0,0 +1,277 @@
+"""
+Admission control for the Veterinary Chatbot API
+
+Encoding a question is CPU-bound. Under a traffic spike every request would
+queue behind the model until the proxy times out and every user gets an error.
+Requests that need the model pass through an AdmissionController first:
+
+- a token bucket per client (rate and burst) turns away clients asking faster
+  than their share (429);
+- at most max_in_flight requests use the model at once, up to max_queue more
+  wait in arrival order, and new requests are turned away when the queue is
+  full (503);
+- every request carries a deadline (its client's timeout). A waiting request
+  that can no longer finish in time, judged by the recent model time, is
+  dropped (503) instead of being answered to a client that has gone.
+
+Cache hits and bare disease names are answered before admission (see
+ChatbotEngine.query), so they keep working while the model is saturated.
+"""
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+SHED_REASONS = ("rate_limited", "queue_full", "deadline")
+
+_MESSAGES = {
+    "rate_limited": "Too many requests. Please slow down.",
+    "queue_full": "Chatbot is overloaded. Please retry shortly.",
+    "deadline": "Chatbot is overloaded and could not answer in time. Please retry shortly.",
+}
+
+
+class Rejected(Exception):
+    """A request shed by admission control"""
+
+    def __init__(self, reason, retry_after=1):
+        super().__init__(_MESSAGES[reason])
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def status_code(self):
+        return 429 if self.reason == "rate_limited" else 503
+
+
+class TokenBucket:
+    """Refills `rate` tokens per second up to `burst`"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+
+    def take(self, now, tokens=1):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    def seconds_until(self, tokens=1):
+        return max(0.0, (tokens - self.tokens) / self.rate)
+
+
+class _Waiter:
+    __slots__ = ("deadline", "event", "granted")
+
+    def __init__(self, deadline):
+        self.deadline = deadline
+        self.event = threading.Event()
+        self.granted = False
+
+
+class AdmissionController:
+    """
+    Bounded in-flight model work with per-client rate limits and deadline-aware
+    queueing. max_in_flight=0 disables admission control; client_rate=0
+    disables the rate limit. Deadlines are time.monotonic() values.
+    """
+
+    def __init__(self, max_in_flight=2, max_queue=16, timeout=25.0, client_rate=5.0,
+                 client_burst=20, max_clients=10000, trusted_proxies=1):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.max_clients = max_clients
+        self.trusted_proxies = trusted_proxies
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waiters = deque()
+        self._buckets = OrderedDict()
+        self._service_seconds = 0.0  # moving average of the time a request holds a slot
+        self._released = 0
+        # Metrics
+        self.admitted = 0
+        self.queued = 0
+        self.shed = dict.fromkeys(SHED_REASONS, 0)
+
+    @property
+    def enabled(self):
+        return self.max_in_flight > 0
+
+    @contextmanager
+    def admit(self, client, deadline, cost=1):
+        """
+        Hold a model slot for the duration of the block, or raise Rejected.
+        cost is the number of questions (tokens taken from the client's bucket).
+        Requests shed for a full queue or a missed deadline get their tokens
+        back, so client retries of a 503 do not run into the rate limit.
+        """
+        if not self.enabled:
+            yield
+            return
+        tokens = self._take_tokens(client, cost)
+        try:
+            self._acquire(deadline)
+        except Rejected:
+            self._refund_tokens(client, tokens)
+            raise
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(time.monotonic() - start)
+
+    def _take_tokens(self, client, cost):
+        if self.client_rate <= 0:
+            return 0
+        tokens = min(cost, self.client_burst)
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = self._buckets[client] = TokenBucket(self.client_rate, self.client_burst, now)
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(client)
+            if not bucket.take(now, tokens):
+                self._shed("rate_limited", bucket.seconds_until(tokens))
+        return tokens
+
+    def _refund_tokens(self, client, tokens):
+        if not tokens:
+            return
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is not None:
+                bucket.tokens = min(bucket.burst, bucket.tokens + tokens)
+
+    def _acquire(self, deadline):
+        with self._lock:
+            now = time.monotonic()
+            if not self._can_finish(deadline, now):
+                self._shed("deadline")
+            if self._in_flight < self.max_in_flight and not self._waiters:
+                self._in_flight += 1
+                self.admitted += 1
+                return
+            if len(self._waiters) >= self.max_queue:
+                self._shed("queue_full")
+            waiter = _Waiter(deadline)
+            self._waiters.append(waiter)
+            self.queued += 1
+            # Give up once even an immediate start would finish too late
+            wait = deadline - now - self._service_seconds
+
+        waiter.event.wait(max(0.0, wait))
+        with self._lock:
+            if waiter.granted:
+                self.admitted += 1
+                return
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass  # already dropped by _release
+            self._shed("deadline")
+
+    def _release(self, seconds):
+        with self._lock:
+            self._released += 1
+            if self._released == 1:
+                self._service_seconds = seconds
+            else:
+                self._service_seconds = 0.8 * self._service_seconds + 0.2 * seconds
+            now = time.monotonic()
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if self._can_finish(waiter.deadline, now):
+                    # Hand the slot straight to the next waiter
+                    waiter.granted = True
+                    waiter.event.set()
+                    return
+                waiter.event.set()  # too late: it wakes up and sheds itself
+            self._in_flight -= 1
+
+    def _can_finish(self, deadline, now):
+        return deadline - now > self._service_seconds
+
+    def _shed(self, reason, retry_after=None):
+        # Called with the lock held
+        self.shed[reason] += 1
+        if retry_after is None:
+            backlog = (len(self._waiters) + self._in_flight) / self.max_in_flight
+            retry_after = backlog * self._service_seconds
+        raise Rejected(reason, max(1, math.ceil(retry_after)))
+
+    def stats(self):
+        """In-flight and queued requests and shed counts per reason"""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "max_in_flight": self.max_in_flight,
+                "max_queue": self.max_queue,
+                "client_rate": self.client_rate,
+                "client_burst": self.client_burst,
+                "in_flight": self._in_flight,
+                "queue_length": len(self._waiters),
+                "admitted": self.admitted,
+                "queued": self.queued,
+                "shed": dict(self.shed),
+                "shed_total": sum(self.shed.values()),
+                "avg_service_ms": self._service_seconds * 1000,
+                "clients": len(self._buckets),
+            }
+
+
+def client_key(remote_addr, forwarded_for=None, trusted_proxies=1):
+    """
+    The caller's address. Each proxy appends the address it received the request
+    from to X-Forwarded-For, so behind trusted_proxies proxies of our own the
+    caller is that many hops from the right; everything to its left is whatever
+    the client sent and could be rotated to dodge the rate limit. Without enough
+    hops (or with trusted_proxies=0) the peer address is used.
+    """
+    if forwarded_for and trusted_proxies > 0:
+        hops = [hop.strip() for hop in forwarded_for.split(",") if hop.strip()]
+        if len(hops) >= trusted_proxies:
+            return hops[-trusted_proxies]
+    return remote_addr or "unknown"
+
+
+def request_deadline(timeout_header, default_timeout):
+    """
+    Monotonic deadline from the client's X-Request-Timeout header (seconds),
+    capped at default_timeout (the proxy's own timeout)
+    """
+    timeout = default_timeout
+    try:
+        if timeout_header:
+            timeout = min(float(timeout_header), default_timeout)
+    except ValueError:
+        pass
+    return time.monotonic() + timeout
+
+
+def admission_from_env():
+    """AdmissionController configured from ADMISSION_* and CLIENT_* environment variables"""
+    return AdmissionController(
+        max_in_flight=int(os.environ.get("ADMISSION_MAX_IN_FLIGHT", "2")),
+        max_queue=int(os.environ.get("ADMISSION_MAX_QUEUE", "16")),
+        timeout=float(os.environ.get("ADMISSION_TIMEOUT", "25")),
+        client_rate=float(os.environ.get("CLIENT_RATE", "5")),
+        client_burst=int(os.environ.get("CLIENT_BURST", "20")),
+        # Proxies in front of the service that append to X-Forwarded-For (Render, HF Spaces: 1)
+        trusted_proxies=int(os.environ.get("TRUSTED_PROXIES", "1")),
+    )
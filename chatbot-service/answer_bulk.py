@@ -0,0 +1,186 @@
+"""
+Answer a file of questions with the chatbot engine, without the HTTP API
+
+Reads JSONL (one object per line with a "question" or "message" field, or a
+plain JSON string) or CSV (a "question" or "message" column), answers the
+questions in large batches and writes one JSON object per line with the
+answer, score and detected disease. Output order matches the input.
+
+The engine is loaded once; with --workers > 1 (Linux) worker processes are
+forked from it and share the model and index copy-on-write, each answering
+whole batches with torch limited to one thread. Engine settings come from the
+same environment variables as the API (see engine.py).
+
+Usage:
+    python answer_bulk.py --input logged_questions.jsonl --output answers.jsonl
+    python answer_bulk.py --input questions.csv --output answers.jsonl --workers 4 --batch-size 512
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing as mp
+import sys
+import time
+from collections import deque
+
+from engine import ChatbotEngine, settings_from_env
+
+QUESTION_FIELDS = ("question", "message")
+
+_engine = None
+
+
+def _init_worker():
+    import torch
+    torch.set_num_threads(1)
+
+
+def _answer_chunk(chunk):
+    records, texts, languages = chunk
+    return records, _engine.query_batch(texts, languages)
+
+
+def read_records(path, fmt):
+    """Yield input records as dicts"""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+            return
+        for line in f:
+            line = line.strip()
+            if line:
+                record = json.loads(line)
+                yield record if isinstance(record, dict) else {"question": record}
+
+
+def question_of(record, field=None):
+    """The question text of a record (the given field, else the first known one)"""
+    for name in ([field] if field else QUESTION_FIELDS):
+        value = record.get(name)
+        if isinstance(value, str) and value.strip():
+            return value
+    return None
+
+
+def chunked(records, batch_size, question_field, language_field, default_language):
+    """
+    Group records into (records, texts, languages) batches. Records without a
+    question are yielded alone with no texts, to be written as errors.
+    """
+    batch = []
+    for record in records:
+        if question_of(record, question_field) is None:
+            if batch:
+                yield _split(batch, question_field, language_field, default_language)
+                batch = []
+            yield [record], [], []
+            continue
+        batch.append(record)
+        if len(batch) == batch_size:
+            yield _split(batch, question_field, language_field, default_language)
+            batch = []
+    if batch:
+        yield _split(batch, question_field, language_field, default_language)
+
+
+def _split(batch, question_field, language_field, default_language):
+    texts = [question_of(r, question_field) for r in batch]
+    languages = [r.get(language_field) or default_language for r in batch]
+    return batch, texts, languages
+
+
+def output_records(records, results):
+    """Merge results back into their input records"""
+    if not results:
+        return [{**record, "status": "error", "error": "Empty question"} for record in records]
+    return [{**record, **result, "status": "success"} for record, result in zip(records, results)]
+
+
+def run(engine, chunks, out, workers, report_every=1000):
+    """Answer every chunk and write JSONL; returns (questions answered, seconds)"""
+    global _engine
+
+    start = time.perf_counter()
+    done = 0
+    next_report = report_every
+
+    def write(records, results):
+        nonlocal done, next_report
+        for record in output_records(records, results):
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        done += len(results)
+        if done >= next_report:
+            elapsed = time.perf_counter() - start
+            print(f"   Answered {done} questions ({done / elapsed:.0f}/sec)", file=sys.stderr)
+            next_report = (done // report_every + 1) * report_every
+
+    if workers <= 1:
+        for records, texts, languages in chunks:
+            write(records, engine.query_batch(texts, languages) if texts else [])
+        return done, time.perf_counter() - start
+
+    _engine = engine
+    try:
+        with mp.get_context("fork").Pool(workers, initializer=_init_worker) as pool:
+            # A bounded window of batches in flight keeps memory flat on large inputs
+            in_flight = deque()
+            for chunk in chunks:
+                if not chunk[1]:
+                    in_flight.append(chunk[0])
+                else:
+                    in_flight.append(pool.apply_async(_answer_chunk, (chunk,)))
+                while len(in_flight) > workers * 2 or (in_flight and isinstance(in_flight[0], list)):
+                    _write_next(in_flight, write)
+            while in_flight:
+                _write_next(in_flight, write)
+    finally:
+        _engine = None
+    return done, time.perf_counter() - start
+
+
+def _write_next(in_flight, write):
+    item = in_flight.popleft()
+    if isinstance(item, list):
+        write(item, [])
+    else:
+        write(*item.get())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", required=True, help="JSONL or CSV file of questions")
+    parser.add_argument("--output", required=True, help="JSONL file to write answers to")
+    parser.add_argument("--format", choices=("jsonl", "csv"),
+                        help="Input format (default: from the file extension)")
+    parser.add_argument("--question-field", help="Field/column holding the question (default: question or message)")
+    parser.add_argument("--language-field", default="language", help="Field/column holding the answer language")
+    parser.add_argument("--language", default="en", help="Answer language when a record has none")
+    parser.add_argument("--batch-size", type=int, default=256, help="Questions per engine batch")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes (Linux only)")
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.input.lower().endswith(".csv") else "jsonl")
+    workers = args.workers
+    if workers > 1 and not sys.platform.startswith("linux"):
+        print("⚠️  Worker processes need Linux fork; answering in-process", file=sys.stderr)
+        workers = 1
+
+    load_start = time.perf_counter()
+    engine = ChatbotEngine(**settings_from_env())
+    engine.load()
+    load_seconds = time.perf_counter() - load_start
+
+    chunks = chunked(read_records(args.input, fmt), args.batch_size,
+                     args.question_field, args.language_field, args.language)
+    with open(args.output, "w", encoding="utf-8") as out:
+        done, seconds = run(engine, chunks, out, workers)
+
+    rate = done / seconds if seconds > 0 else 0.0
+    print(f"✅ Answered {done} questions in {seconds:.1f}s ({rate:.1f} questions/sec, "
+          f"{workers} worker(s), batch {args.batch_size}); engine load {load_seconds:.1f}s")
+    print(f"   Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""
+Accuracy/latency report for the chatbot index modes
+
+Holds out a share of the paraphrased questions of every answer, builds each
+index mode from the remaining rows and checks whether the held-out question
+still retrieves its own answer. A second table compares flat and
+hierarchical (disease-first) search as the corpus grows: scales below 1 keep
+that share of the diseases, scales above 1 replicate the corpus with jitter.
+With --multilingual-model, a third table compares per-language indexes with
+the shared cross-language index (multilingual.py), per query language.
+
+Usage:
+    python benchmark_index.py
+    python benchmark_index.py --holdout 0.25 --medoids 3 --truncate 1500
+    python benchmark_index.py --corpus-scales 0.25,0.5,1,4,16 --top-diseases 3
+    python benchmark_index.py --multilingual-model paraphrase-multilingual-MiniLM-L12-v2
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from multilingual import build_multilingual_index, collection_language, translated_row
+from parallel_encode import encode_texts
+from retrieval import (
+    build_answer_index, build_disease_index, group_rows_by_answer, hierarchical_search,
+    normalize_rows, search,
+)
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "data", "processed_template_qa.json")
+DISEASE_NAMES_DIRS = [os.path.join(os.path.dirname(__file__), "data"),
+                      os.path.join(os.path.dirname(__file__), "..")]
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+
+def load_rows(path):
+    """Load the Q&A dataset as a list of dicts"""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def encode_questions(questions, model_name, cache_path=None, workers=1):
+    """Encode all questions once, optionally caching the matrix as .npy"""
+    if cache_path and os.path.exists(cache_path):
+        print(f"📂 Loading cached embeddings from {cache_path}")
+        return np.load(cache_path)
+
+    from sentence_transformers import SentenceTransformer
+
+    print(f"🔄 Encoding {len(questions)} questions with {model_name}...")
+    embedder = SentenceTransformer(model_name, device="cpu")
+    embeddings, _ = encode_texts(embedder, questions, batch_size=64, workers=workers)
+    embeddings = normalize_rows(embeddings)
+    if cache_path:
+        np.save(cache_path, embeddings)
+    return embeddings
+
+
+def split_holdout(answers, holdout, seed):
+    """
+    Hold out a share of rows from every answer group that has at least two rows,
+    so each held-out answer is still represented in the index.
+    Returns (train_rows, test_rows) as sorted arrays of row numbers.
+    """
+    rng = np.random.default_rng(seed)
+    _, groups = group_rows_by_answer(answers)
+    train, test = [], []
+    for members in groups:
+        members = list(members)
+        if len(members) < 2:
+            train.extend(members)
+            continue
+        rng.shuffle(members)
+        n_test = min(len(members) - 1, max(1, int(round(len(members) * holdout))))
+        test.extend(members[:n_test])
+        train.extend(members[n_test:])
+    return np.array(sorted(train)), np.array(sorted(test))
+
+
+def flat_searcher(index_embeddings):
+    """Return a query -> index position function for flat search"""
+    return lambda query: int(search(query, index_embeddings)[0][0])
+
+
+def hierarchical_searcher(index_embeddings, index_diseases, top_diseases):
+    """Return a query -> index position function for disease-first search"""
+    _, disease_embeddings, disease_members = build_disease_index(index_embeddings, index_diseases)
+    return lambda query: hierarchical_search(
+        query, index_embeddings, disease_embeddings, disease_members, top_diseases
+    )[0]
+
+
+def evaluate(name, index_embeddings, index_rows, test_embs, test_answers, test_diseases,
+             answers, diseases, searcher=None):
+    """Run every held-out query through an index and collect accuracy and latency"""
+    searcher = searcher or flat_searcher(index_embeddings)
+    latencies = []
+    answer_hits = 0
+    disease_hits = 0
+    for query, expected_answer, expected_disease in zip(test_embs, test_answers, test_diseases):
+        start = time.perf_counter()
+        position = searcher(query)
+        latencies.append(time.perf_counter() - start)
+        row = int(index_rows[position])
+        answer_hits += answers[row] == expected_answer
+        disease_hits += diseases[row] == expected_disease
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "mode": name,
+        "vectors": int(len(index_rows)),
+        "index_mb": index_embeddings.nbytes / (1024 ** 2),
+        "answer_accuracy": answer_hits / len(test_answers),
+        "disease_accuracy": disease_hits / len(test_answers),
+        "mean_ms": float(latencies_ms.mean()),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+    }
+
+
+def scaled_corpus(scale, train, test, embeddings, diseases, rng):
+    """
+    Build a corpus for one growth step.
+    scale <= 1 keeps that share of diseases (and their held-out queries);
+    scale > 1 replicates the full corpus with small jitter to mimic more paraphrases.
+    Returns (corpus_embeddings, corpus_rows, test_rows).
+    """
+    if scale <= 1:
+        disease_names = sorted(set(diseases[i] for i in train))
+        keep = set(rng.permutation(disease_names)[:max(1, int(round(len(disease_names) * scale)))])
+        corpus_rows = np.array([i for i in train if diseases[i] in keep])
+        test_rows = np.array([i for i in test if diseases[i] in keep])
+        return embeddings[corpus_rows], corpus_rows, test_rows
+
+    copies = int(scale)
+    base = embeddings[train]
+    jittered = [base] + [
+        normalize_rows(base + rng.normal(0, 0.02, base.shape).astype(np.float32))
+        for _ in range(copies - 1)
+    ]
+    return np.vstack(jittered), np.tile(train, copies), test
+
+
+def growth_report(train, test, embeddings, answers, diseases, scales, top_diseases, seed):
+    """Compare flat and hierarchical search at each corpus scale"""
+    rng = np.random.default_rng(seed)
+    results = []
+    for scale in scales:
+        corpus_embs, corpus_rows, test_rows = scaled_corpus(scale, train, test, embeddings, diseases, rng)
+        if len(test_rows) == 0:
+            continue
+        test_args = (
+            embeddings[test_rows],
+            [answers[i] for i in test_rows],
+            [diseases[i] for i in test_rows],
+            answers,
+            diseases,
+        )
+        corpus_diseases = [diseases[i] for i in corpus_rows]
+        for name, searcher in [
+            ("flat", flat_searcher(corpus_embs)),
+            (f"hierarchical (top {top_diseases})",
+             hierarchical_searcher(corpus_embs, corpus_diseases, top_diseases)),
+        ]:
+            results.append(evaluate(f"x{scale:g} {name}", corpus_embs, corpus_rows, *test_args,
+                                    searcher=searcher))
+    return results
+
+
+def multilingual_report(rows, train, test, model_name, workers):
+    """
+    Per query language, compare a per-language question index and centroid index
+    with the shared cross-language group index, all encoded with one
+    multilingual model. Shared-index hits are mapped to the query's language.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    questions = [item["question"] for item in rows]
+    answers = [item["answer"] for item in rows]
+    diseases = [item.get("disease", "Unknown") for item in rows]
+    collections = [item.get("collection", "Unknown") for item in rows]
+
+    print(f"🔄 Encoding {len(questions)} questions with {model_name}...")
+    embedder = SentenceTransformer(model_name, device="cpu")
+    embeddings, _ = encode_texts(embedder, questions, batch_size=64, workers=workers)
+    embeddings = normalize_rows(embeddings)
+
+    def subset(values):
+        return [values[i] for i in train]
+
+    train_embs = embeddings[train]
+    shared_embeddings, _, _, translations = build_multilingual_index(
+        embedder, train_embs, subset(questions), subset(answers), subset(diseases), subset(collections),
+        DISEASE_NAMES_DIRS, batch_size=64, workers=workers,
+    )
+    centroid_embeddings, centroid_rows = build_answer_index(train_embs, subset(answers), mode="centroid")
+
+    results = []
+    for language in sorted(set(collection_language(collections[i]) for i in test)):
+        lang_test = np.array([i for i in test if collection_language(collections[i]) == language])
+        test_args = (
+            embeddings[lang_test],
+            [answers[i] for i in lang_test],
+            [diseases[i] for i in lang_test],
+            answers,
+            diseases,
+        )
+        shared_rows = train[[translated_row(t, language) for t in translations]]
+        results.append(evaluate(f"{language} per-language rows", train_embs, train, *test_args))
+        results.append(evaluate(f"{language} per-language centroids", centroid_embeddings,
+                                train[centroid_rows], *test_args))
+        results.append(evaluate(f"{language} shared groups", shared_embeddings, shared_rows, *test_args))
+    return results
+
+
+def print_report(results):
+    """Print results as a fixed-width table"""
+    header = f"{'mode':<30}{'vectors':>9}{'index MB':>10}{'answer acc':>12}{'disease acc':>13}{'mean ms':>9}{'p95 ms':>9}"
+    print("\n" + header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r['mode']:<30}{r['vectors']:>9}{r['index_mb']:>10.2f}"
+            f"{r['answer_accuracy']:>12.3f}{r['disease_accuracy']:>13.3f}"
+            f"{r['mean_ms']:>9.3f}{r['p95_ms']:>9.3f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=DATA_PATH, help="Path to processed_template_qa.json")
+    parser.add_argument("--model", default=MODEL_NAME, help="Sentence Transformer model name")
+    parser.add_argument("--holdout", type=float, default=0.2, help="Share of each answer group held out as queries")
+    parser.add_argument("--medoids", type=int, default=2, help="Vectors per answer in medoid mode")
+    parser.add_argument("--truncate", type=int, default=1500,
+                        help="Also report the MAX_DATASET_SIZE truncation baseline (0 to skip)")
+    parser.add_argument("--corpus-scales", default="0.25,0.5,1,4",
+                        help="Comma-separated corpus scales for the flat vs hierarchical table (empty to skip)")
+    parser.add_argument("--top-diseases", type=int, default=3, help="Diseases searched in stage two")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--embeddings-cache", help="Optional .npy path to reuse encoded questions")
+    parser.add_argument("--workers", type=int, default=1, help="Encoder worker processes")
+    parser.add_argument("--multilingual-model",
+                        help="Also compare per-language and shared cross-language indexes with this model")
+    parser.add_argument("--json", dest="json_out", help="Optional path to write the results as JSON")
+    args = parser.parse_args()
+
+    rows = load_rows(args.data)
+    questions = [item["question"] for item in rows]
+    answers = [item["answer"] for item in rows]
+    diseases = [item.get("disease", "Unknown") for item in rows]
+    embeddings = encode_questions(questions, args.model, args.embeddings_cache, args.workers)
+
+    train, test = split_holdout(answers, args.holdout, args.seed)
+    print(f"📊 {len(train)} indexed rows, {len(test)} held-out queries")
+
+    train_embs = embeddings[train]
+    train_answers = [answers[i] for i in train]
+    test_embs = embeddings[test]
+    test_answers = [answers[i] for i in test]
+    test_diseases = [diseases[i] for i in test]
+
+    candidates = [
+        ("question", "question", train),
+        ("centroid", "centroid", train),
+        (f"medoid (k={args.medoids})", "medoid", train),
+    ]
+    if args.truncate > 0:
+        candidates.append((f"truncated ({args.truncate})", "question", train[:args.truncate]))
+
+    results = []
+    for name, mode, rows_used in candidates:
+        if rows_used is train:
+            embs, used_answers = train_embs, train_answers
+        else:
+            embs, used_answers = embeddings[rows_used], [answers[i] for i in rows_used]
+        index_embeddings, local_rows = build_answer_index(
+            embs, used_answers, mode=mode, medoids_per_group=args.medoids
+        )
+        index_rows = rows_used[local_rows]
+        results.append(evaluate(name, index_embeddings, index_rows, test_embs,
+                                test_answers, test_diseases, answers, diseases))
+
+    print_report(results)
+
+    if args.corpus_scales:
+        scales = [float(x) for x in args.corpus_scales.split(",")]
+        growth = growth_report(train, test, embeddings, answers, diseases, scales,
+                               args.top_diseases, args.seed)
+        print_report(growth)
+        results.extend(growth)
+
+    if args.multilingual_model:
+        multilingual = multilingual_report(rows, train, test, args.multilingual_model, args.workers)
+        print_report(multilingual)
+        results.extend(multilingual)
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✅ Wrote {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+Python client for the Veterinary Chatbot API
+
+One requests.Session per client keeps connections alive in a pooled
+HTTPAdapter. Every request has connect and read timeouts, and connection
+errors and 429/502/503/504 responses are retried with exponential backoff
+(503 is what /chat answers while the model is still loading).
+
+ask() may be called from many threads at once: questions that arrive within
+batch_wait seconds of each other, or while every connection is busy, are sent
+together to /chat/batch, where the server encodes them in one model call.
+AsyncChatbotClient offers the same calls as coroutines.
+
+Usage:
+    from chatbot_client import ChatbotClient
+
+    with ChatbotClient("http://localhost:5000") as client:
+        print(client.ask("What is mastitis?")["response"])
+        answers = client.ask_many(["Fowl pox treatment", "Bloat in goats"])
+"""
+
+import asyncio
+import functools
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Retried with backoff: rate limited, bad gateway, starting up, gateway timeout
+RETRY_STATUSES = (429, 502, 503, 504)
+
+_STOP = object()
+
+
+class ChatbotError(Exception):
+    """An error answer from the chatbot API"""
+
+    def __init__(self, message, status_code=None, payload=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.payload = payload or {}
+
+
+class ChatbotClient:
+    """
+    Thread-safe client with keep-alive pooling, retries and request coalescing.
+
+    pool_size bounds both the open connections and the requests in flight;
+    batch_size is the most questions sent in one /chat/batch request and
+    batch_wait how long (seconds) the first question of a batch waits for
+    company (0 sends whatever is already queued). Servers without /chat/batch
+    are detected on the first 404 and asked one question at a time.
+    """
+
+    def __init__(self, base_url, connect_timeout=3.05, read_timeout=30.0, retries=3,
+                 backoff_factor=0.5, pool_size=10, batch_size=32, batch_wait=0.005):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = batch_wait
+
+        # Answering is read-only, so POSTs are as safe to retry as GETs
+        retry = Retry(
+            total=retries, backoff_factor=backoff_factor, status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({"GET", "POST"}), raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        # The server drops queued questions it can no longer answer within this time
+        self.session.headers["X-Request-Timeout"] = str(read_timeout)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._pending = queue.Queue()
+        self._slots = threading.Semaphore(pool_size)
+        self._senders = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="chatbot-client")
+        self._batcher = None
+        self._batch_supported = True
+        self._lock = threading.Lock()
+        self._closed = False
+
+    # ---- plain calls ----
+
+    def health(self):
+        return self._request("GET", "/health")
+
+    def metrics(self):
+        return self._request("GET", "/metrics")
+
+    def suggest(self, prefix, language="en", limit=8):
+        """Typeahead completions as [{"text", "type"}]"""
+        params = {"q": prefix, "language": language, "limit": limit}
+        return self._request("GET", "/suggest", params=params)["suggestions"]
+
+    def chat(self, message, language="en"):
+        """Ask one question with its own /chat request (no coalescing)"""
+        return self._request("POST", "/chat", json={"message": message, "language": language})
+
+    # ---- coalesced calls ----
+
+    def submit(self, message, language="en"):
+        """Queue a question for the next batch; returns a concurrent.futures.Future"""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("ChatbotClient is closed")
+            if self._batcher is None:
+                self._batcher = threading.Thread(
+                    target=self._run_batcher, name="chatbot-client-batcher", daemon=True
+                )
+                self._batcher.start()
+            self._pending.put((message, language, future))
+        return future
+
+    def ask(self, message, language="en"):
+        """Answer a question; concurrent calls share batch requests"""
+        return self.submit(message, language).result()
+
+    def ask_many(self, messages, language="en"):
+        """Answer several questions; results keep the input order"""
+        futures = [self.submit(message, language) for message in messages]
+        return [future.result() for future in futures]
+
+    def close(self):
+        """Send what is queued, then release the threads and connections"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            batcher = self._batcher
+            if batcher is not None:
+                self._pending.put(_STOP)
+        if batcher is not None:
+            batcher.join()
+        self._senders.shutdown(wait=True)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---- internals ----
+
+    def _request(self, method, path, **kwargs):
+        response = self.session.request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+        try:
+            data = response.json()
+        except ValueError:
+            data = {}
+        if response.status_code >= 400:
+            error = data.get("error") if isinstance(data, dict) else None
+            raise ChatbotError(error or f"HTTP {response.status_code}", response.status_code, data)
+        return data
+
+    def _run_batcher(self):
+        while True:
+            item = self._pending.get()
+            if item is _STOP:
+                return
+            # While every connection is busy, later questions join this batch
+            self._slots.acquire()
+            batch, stop = [item], False
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._pending.get(timeout=remaining) if remaining > 0 else self._pending.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._senders.submit(self._send, batch)
+            if stop:
+                return
+
+    def _send(self, batch):
+        try:
+            # Callers may have cancelled their futures while queued
+            batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+            if len(batch) > 1 and self._batch_supported:
+                try:
+                    self._send_batch(batch)
+                    return
+                except ChatbotError as e:
+                    if e.status_code not in (404, 405):
+                        raise
+                    self._batch_supported = False  # older server without /chat/batch
+            for message, language, future in batch:
+                try:
+                    future.set_result(self.chat(message, language))
+                except Exception as e:
+                    future.set_exception(e)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._slots.release()
+
+    def _send_batch(self, batch):
+        messages = [{"message": message, "language": language} for message, language, _ in batch]
+        results = self._request("POST", "/chat/batch", json={"messages": messages})["results"]
+        for (_, _, future), result in zip(batch, results):
+            if result.get("status") == "success":
+                future.set_result(result)
+            else:
+                future.set_exception(ChatbotError(result.get("error", "Request failed"), 400, result))
+
+
+class AsyncChatbotClient:
+    """
+    asyncio interface over ChatbotClient: ask() awaits the coalesced batch
+    without holding a thread; the plain calls run in the default executor.
+    """
+
+    def __init__(self, base_url, **options):
+        self._client = ChatbotClient(base_url, **options)
+
+    async def ask(self, message, language="en"):
+        return await asyncio.wrap_future(self._client.submit(message, language))
+
+    async def ask_many(self, messages, language="en"):
+        return await asyncio.gather(*(self.ask(message, language) for message in messages))
+
+    async def chat(self, message, language="en"):
+        return await self._run(self._client.chat, message, language)
+
+    async def health(self):
+        return await self._run(self._client.health)
+
+    async def metrics(self):
+        return await self._run(self._client.metrics)
+
+    async def suggest(self, prefix, language="en", limit=8):
+        return await self._run(self._client.suggest, prefix, language, limit)
+
+    async def close(self):
+        await self._run(self._client.close)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    @staticmethod
+    async def _run(func, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, functools.partial(func, *args))
@@ -0,0 +1,170 @@
+"""
+Disease-name matcher for the Veterinary Chatbot API
+
+An Aho-Corasick automaton over every disease name in the dataset and in the
+multilingual name tables (en/ta/ml/hi, see multilingual.py), built once at
+startup. A query is normalised the same way as the names and scanned in a
+single pass, so detecting a literally named disease costs microseconds and no
+model call. /chat uses the match to restrict the similarity search to that
+disease's rows, or to answer a bare disease name without encoding at all.
+"""
+
+from collections import deque
+
+import numpy as np
+
+from multilingual import COLLECTION_LANGUAGES, DiseaseNameTable, normalize_name
+
+# Names shorter than this (after normalisation) are too ambiguous to match on
+MIN_NAME_LENGTH = 3
+
+
+class AhoCorasick:
+    """Multi-pattern string matcher; add() patterns, build(), then find_all()"""
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]  # (pattern length, value) pairs ending at each state
+        self._built = False
+
+    def add(self, pattern, value):
+        state = 0
+        for char in pattern:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = nxt
+        self._output[state].append((len(pattern), value))
+        self._built = False
+
+    def build(self):
+        """Compute failure links breadth-first and merge outputs along them"""
+        queue = deque(self._goto[0].values())
+        for state in queue:
+            self._fail[state] = 0
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._output[nxt] = self._output[nxt] + self._output[self._fail[nxt]]
+        self._built = True
+
+    def find_all(self, text):
+        """Yield (start, end, value) for every pattern occurrence in text"""
+        if not self._built:
+            self.build()
+        state = 0
+        for end, char in enumerate(text, 1):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for length, value in self._output[state]:
+                yield end - length, end, value
+
+    def __len__(self):
+        return len(self._goto)
+
+
+class DiseaseMatcher:
+    """
+    Finds the disease named in a query.
+
+    Patterns are the dataset's own disease labels plus, when a name table is
+    given, every language's name for the same (category, id); each pattern maps
+    to the dataset labels it stands for. Names are matched on whole words.
+
+    The name tables are not always aligned across languages, so table links are
+    only used for names the dataset does not spell itself (for example a
+    Malayalam or Hindi name), and never to answer a bare disease name.
+    """
+
+    def __init__(self, diseases, row_collections, name_entries=None):
+        table = DiseaseNameTable(name_entries) if name_entries else None
+        # Dataset labels per pattern: spelled as the pattern, or linked by the tables
+        self._labels = {}
+        self._linked = {}
+        linked = {}
+        for disease, collection in zip(diseases, row_collections):
+            self._add(self._labels, disease, disease)
+            if table is not None:
+                category = COLLECTION_LANGUAGES.get(collection, (collection, "en"))[0]
+                disease_id = table.resolve(category, disease)
+                if disease_id is not None:
+                    linked.setdefault((category, disease_id), []).append(disease)
+        for key, labels in linked.items():
+            for name in table.entries[key].get("names", {}).values():
+                for label in labels:
+                    self._add(self._linked, name or "", label)
+
+        self._automaton = AhoCorasick()
+        for pattern in set(self._labels) | set(self._linked):
+            # Pad with spaces so only whole words match
+            self._automaton.add(f" {pattern} ", pattern)
+        self._automaton.build()
+
+    @staticmethod
+    def _add(patterns, name, label):
+        pattern = normalize_name(name)
+        if len(pattern) < MIN_NAME_LENGTH or label == "Unknown":
+            return
+        labels = patterns.setdefault(pattern, [])
+        if label not in labels:
+            labels.append(label)
+
+    @property
+    def size(self):
+        return len(set(self._labels) | set(self._linked))
+
+    def match(self, text):
+        """
+        Return the longest disease name in text, or None, as a dict with the
+        matched name, the dataset labels it maps to and whether the query is
+        nothing but a dataset disease label.
+        """
+        query = normalize_name(text)
+        best = None
+        for _, _, pattern in self._automaton.find_all(f" {query} "):
+            if best is None or len(pattern) > len(best):
+                best = pattern
+        if best is None:
+            return None
+        exact = best in self._labels
+        return {
+            "name": best,
+            "diseases": list(self._labels[best] if exact else self._linked[best]),
+            "name_only": exact and best == query,
+        }
+
+
+def positions_by_disease(position_labels):
+    """
+    Map each disease label to the index positions carrying it, where
+    position_labels[pos] lists the labels of index position pos.
+    """
+    positions = {}
+    for pos, labels in enumerate(position_labels):
+        for label in labels:
+            positions.setdefault(label, []).append(pos)
+    return {label: np.asarray(found, dtype=np.int32) for label, found in positions.items()}
+
+
+def candidate_positions(match, disease_positions):
+    """Index positions of every disease a match maps to, first disease first"""
+    found = [disease_positions[label] for label in match["diseases"] if label in disease_positions]
+    if not found:
+        return None
+    first, rest = found[0], found[1:]
+    if not rest:
+        return first
+    others = np.setdiff1d(np.concatenate(rest), first)
+    return np.concatenate([first, others])
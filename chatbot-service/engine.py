@@ -0,0 +1,617 @@
+"""
+Retrieval engine for the Veterinary Chatbot API
+
+Everything between "a question comes in" and "an answer goes out", without
+Flask: dataset loading, the model, index building, the disease-name fast path,
+the query cache and typeahead. app.py and app_hf.py serve it over HTTP;
+answer_bulk.py runs it over files.
+
+Usage:
+    from engine import ChatbotEngine, settings_from_env
+
+    engine = ChatbotEngine(**settings_from_env())
+    engine.load()
+    engine.query("What are the symptoms of Fowl Pox?")
+    engine.query_batch(["fowl pox treatment", "mastitis in goats"], languages=["en", "en"])
+"""
+
+import gc
+import json
+import os
+import time
+from contextlib import nullcontext
+
+import numpy as np
+
+from retrieval import (
+    INDEX_MODES, RETRIEVAL_MODES, build_answer_index, build_disease_index,
+    compact_embeddings, group_rows_by_answer, hierarchical_search, normalize_rows, search,
+    search_batch,
+)
+from query_cache import SemanticQueryCache
+from memory_budget import (
+    MB, model_nbytes, plan_layout, process_rss_bytes, strata_count, stratified_group_sample, stratified_sample,
+    strings_nbytes,
+)
+from model_store import load_embedder
+from startup_timeline import StartupTimeline
+from parallel_encode import default_workers, encode_texts
+from multilingual import (
+    build_multilingual_index, collection_language, load_disease_names, translated_row,
+)
+from disease_matcher import DiseaseMatcher, candidate_positions, positions_by_disease
+from payloads import AnswerPayloads
+from suggest_index import build_suggest_index
+from thread_tuning import describe, prepare_threads, representative_queries, tune_threads
+
+SERVICE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_PATH = os.path.join(SERVICE_DIR, "data", "processed_template_qa.json")
+# Disease name tables written by process_disease_names.py
+DISEASE_NAMES_DIRS = [os.path.join(SERVICE_DIR, "data"), os.path.join(SERVICE_DIR, "..")]
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+DEFAULT_MULTILINGUAL_MODEL = "paraphrase-multilingual-MiniLM-L12-v2"
+
+
+def settings_from_env(**defaults):
+    """
+    ChatbotEngine keyword arguments from environment variables. `defaults`
+    overrides the built-in default of any setting (e.g. encode_batch_size=50).
+    """
+    def env(name, cast=str):
+        key = name.lower()
+        fallback = defaults.get(key, _DEFAULTS[key])
+        value = os.environ.get(name)
+        if value is None:
+            return fallback
+        return value == "1" if cast is bool else cast(value)
+
+    multilingual = env("MULTILINGUAL", bool)
+    return {
+        "data_path": env("DATA_PATH"),
+        # Multilingual mode: one shared index for all languages with a multilingual
+        # encoder. Translated rows are merged into one vector and answers come back
+        # in the requested language.
+        "multilingual": multilingual,
+        "multilingual_min_answer_similarity": env("MULTILINGUAL_MIN_ANSWER_SIMILARITY", float),
+        "model_name": env("MULTILINGUAL_MODEL") if multilingual else env("MODEL_NAME"),
+        # Directory with the model saved at build time (see model_store.py). When set,
+        # the model is loaded from it with Hugging Face Hub access disabled.
+        "model_dir": env("MODEL_DIR"),
+        "model_verify": env("MODEL_VERIFY", bool),
+        # Index layout: "question" (one vector per row), "centroid" (one per distinct
+        # answer) or "medoid" (a few real questions per distinct answer)
+        "index_mode": env("INDEX_MODE").lower(),
+        "medoids_per_group": env("MEDOIDS_PER_GROUP", int),
+        # Search strategy: "flat" (every index vector) or "hierarchical" (best diseases first)
+        "retrieval_mode": env("RETRIEVAL_MODE").lower(),
+        "top_diseases": env("TOP_DISEASES", int),
+        # Disease-name fast path: "filter" restricts the search to a disease named in
+        # the query and answers a bare disease name without encoding; "off" disables it
+        "disease_match": env("DISEASE_MATCH").lower(),
+        # Near-duplicate query cache (QUERY_CACHE_SIZE=0 disables it)
+        "query_cache_size": env("QUERY_CACHE_SIZE", int),
+        "query_cache_threshold": env("QUERY_CACHE_THRESHOLD", float),
+        # Index build: questions per batch and encoder processes (ENCODE_WORKERS=0 = one per core)
+        "encode_batch_size": env("ENCODE_BATCH_SIZE", int),
+        "encode_workers": default_workers(),
+        # Memory budget in MB for the whole process (0 = off, use MAX_DATASET_SIZE instead).
+        # When set, precision, centroid compaction and row sampling are chosen to fit it.
+        "memory_budget_mb": env("MEMORY_BUDGET_MB", int),
+        # Stratified row sample when there is no memory budget (0 = all rows)
+        "max_dataset_size": env("MAX_DATASET_SIZE", int),
+        # gzip every GET /answer/<id> body at load instead of on first request
+        "precompress_answers": env("PRECOMPRESS_ANSWERS", bool),
+        # torch CPU threads per worker: "auto" (calibrated at startup from the cores per
+        # web worker), a fixed count, or "off" (torch defaults; warm-up only)
+        "thread_tuning": env("THREAD_TUNING").lower(),
+    }
+
+
+_DEFAULTS = {
+    "data_path": DATA_PATH,
+    "multilingual": False,
+    "multilingual_min_answer_similarity": 0.6,
+    "multilingual_model": DEFAULT_MULTILINGUAL_MODEL,
+    "model_name": DEFAULT_MODEL,
+    "model_dir": "",
+    "model_verify": True,
+    "index_mode": "question",
+    "medoids_per_group": 2,
+    "retrieval_mode": "flat",
+    "top_diseases": 3,
+    "disease_match": "filter",
+    "query_cache_size": 256,
+    "query_cache_threshold": 0.95,
+    "encode_batch_size": 32,
+    "memory_budget_mb": 0,
+    "max_dataset_size": 0,
+    "precompress_answers": False,
+    "thread_tuning": "auto",
+}
+
+
+class ChatbotEngine:
+    """Dataset, model and indexes behind the chatbot; call load() before querying"""
+
+    def __init__(self, data_path=DATA_PATH, model_name=DEFAULT_MODEL, model_dir="", model_verify=True,
+                 index_mode="question", medoids_per_group=2, retrieval_mode="flat", top_diseases=3,
+                 disease_match="filter", multilingual=False, multilingual_min_answer_similarity=0.6,
+                 query_cache_size=256, query_cache_threshold=0.95, encode_batch_size=32,
+                 encode_workers=1, memory_budget_mb=0, max_dataset_size=0, precompress_answers=False,
+                 thread_tuning="auto", disease_names_dirs=None, timeline=None):
+        self.data_path = data_path
+        self.model_name = model_name
+        self.model_dir = model_dir
+        self.model_verify = model_verify
+        self.medoids_per_group = medoids_per_group
+        self.retrieval_mode = retrieval_mode
+        self.top_diseases = top_diseases
+        self.disease_match = disease_match
+        self.multilingual = multilingual
+        self.multilingual_min_answer_similarity = multilingual_min_answer_similarity
+        self.encode_batch_size = encode_batch_size
+        self.encode_workers = encode_workers
+        self.memory_budget_mb = memory_budget_mb
+        self.max_dataset_size = max_dataset_size
+        self.precompress_answers = precompress_answers
+        self.thread_tuning = thread_tuning
+        self.disease_names_dirs = disease_names_dirs or DISEASE_NAMES_DIRS
+        self.timeline = timeline or StartupTimeline()
+
+        self.embedder = None
+        self.questions = []
+        self.answers = []
+        self.diseases = []
+        self.row_collections = []
+        self.source_rows = []
+        self.q_embeddings = None
+        self.index_embeddings = None
+        self.index_rows = None
+        self.disease_labels = []
+        self.disease_embeddings = None
+        self.disease_members = []
+        self.row_groups = None
+        self.translations = []
+        self.disease_matcher = None
+        self.disease_positions = {}
+        self.disease_match_counts = {"name_only": 0, "filtered": 0}
+        self.suggest_indexes = {}
+        self.payloads = None
+        self.query_cache = SemanticQueryCache(query_cache_size, query_cache_threshold)
+        self.index_mode = index_mode
+        self.index_precision = "float32"
+        self.memory_plan = None
+        self.model_bytes = 0
+        self.metadata_bytes = 0
+        self.thread_plan = None
+        self.thread_report = None
+
+    @property
+    def ready(self):
+        """True once the model and index are loaded"""
+        return self.embedder is not None and self.index_embeddings is not None
+
+    # =====================
+    # Loading
+    # =====================
+    def load(self):
+        """Load dataset and model, build the indexes and warm up"""
+        with self.timeline.phase("dataset_load"):
+            self.load_dataset()
+        # Needs no model, so suggestions work while the model is still loading
+        with self.timeline.phase("suggest_index"):
+            self.build_suggestions()
+        self.initialize_model()
+        with self.timeline.phase("response_payloads"):
+            self.build_payloads()
+        if self.disease_match == "filter":
+            with self.timeline.phase("disease_matcher"):
+                self.build_disease_matcher()
+        with self.timeline.phase("warmup"):
+            self.warm_up()
+        return self
+
+    def keep_rows(self, rows):
+        """Restrict the loaded dataset to the given row numbers"""
+        self.questions = [self.questions[i] for i in rows]
+        self.answers = [self.answers[i] for i in rows]
+        self.diseases = [self.diseases[i] for i in rows]
+        self.row_collections = [self.row_collections[i] for i in rows]
+        self.source_rows = [self.source_rows[i] for i in rows]
+
+    def load_dataset(self):
+        """Load the Q&A dataset"""
+        print(f"📂 Loading dataset from {self.data_path}...")
+        if not os.path.exists(self.data_path):
+            raise FileNotFoundError(
+                f"Dataset file not found at {self.data_path}. "
+                "Please upload processed_template_qa.json to the data/ folder."
+            )
+
+        with open(self.data_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        self.questions = [item["question"] for item in data]
+        self.answers = [item["answer"] for item in data]
+        self.diseases = [item.get("disease", "Unknown") for item in data]
+        self.row_collections = [item.get("collection", "Unknown") for item in data]
+        # Position in the dataset file, kept through sampling (the public answer_id)
+        self.source_rows = list(range(len(data)))
+
+        # Ignored when a memory budget is set - the budget decides what to keep
+        max_size = self.max_dataset_size
+        if self.memory_budget_mb <= 0 and max_size > 0 and len(self.questions) > max_size:
+            print(f"⚠️  Reducing dataset from {len(self.questions)} to {max_size} items to save memory")
+            # Sample across collections and diseases instead of dropping the tail
+            self.keep_rows(stratified_sample(self.row_collections, self.diseases, self.answers, max_size))
+
+        print(f"✅ Loaded {len(self.questions)} Q&A pairs")
+        return True
+
+    def apply_memory_budget(self):
+        """Measure the loaded model and dataset and pick a layout that fits the memory budget"""
+        _, groups = group_rows_by_answer(self.answers)
+        fixed = process_rss_bytes()
+        plan = plan_layout(
+            self.memory_budget_mb * MB,
+            fixed,
+            n_rows=len(self.questions),
+            n_groups=len(groups),
+            dim=self.embedder.get_sentence_embedding_dimension(),
+            metadata_bytes=strings_nbytes(self.questions, self.answers, self.diseases, self.row_collections),
+            index_mode=self.index_mode,
+            medoids_per_group=self.medoids_per_group,
+            # Sampling keeps at least one answer of every collection and disease
+            min_groups=strata_count(self.row_collections, self.diseases, groups),
+        )
+        self.memory_plan = plan
+        print(f"📊 Memory budget {self.memory_budget_mb} MB, process with model loaded: {fixed / MB:.1f} MB")
+        print(f"   Plan: {plan['index_mode']} index, {plan['precision']}, "
+              f"{plan['max_groups']}/{len(groups)} answers, "
+              f"~{plan['estimated_bytes'] / MB:.1f} MB of {plan['available_bytes'] / MB:.1f} MB left")
+        if plan["over_budget"]:
+            print(f"❌ MEMORY_BUDGET_MB={self.memory_budget_mb} cannot hold one int8 centroid per collection and "
+                  f"disease (process already uses {fixed / MB:.1f} MB). Keeping {plan['max_groups']} answers "
+                  f"over budget; raise MEMORY_BUDGET_MB")
+
+        if plan["max_groups"] < len(groups):
+            print(f"⚠️  Sampling dataset down to {plan['max_groups']} of {len(groups)} answers to fit the budget")
+            self.keep_rows(stratified_group_sample(self.row_collections, self.diseases, groups, plan["max_groups"]))
+        return plan["index_mode"], plan["precision"]
+
+    def initialize_model(self):
+        """Load the Sentence Transformer model, encode questions and build the index"""
+        if self.index_mode not in INDEX_MODES:
+            raise ValueError(f"Unknown INDEX_MODE '{self.index_mode}'. Choose one of {INDEX_MODES}")
+        if self.retrieval_mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown RETRIEVAL_MODE '{self.retrieval_mode}'. Choose one of {RETRIEVAL_MODES}")
+
+        def size_threads():
+            # Thread pools are sized after torch is imported, before the model first runs
+            self.thread_plan = prepare_threads(self.thread_tuning)
+
+        print(f"🔄 Loading Sentence Transformer model: {self.model_dir or self.model_name}...")
+        self.embedder = load_embedder(self.model_name, self.model_dir or None, verify=self.model_verify,
+                                      timeline=self.timeline, before_load=size_threads)
+        self.model_bytes = model_nbytes(self.embedder)
+        print(f"✅ Model loaded ({self.model_bytes / MB:.1f} MB of weights)")
+
+        if self.memory_budget_mb > 0:
+            self.index_mode, self.index_precision = self.apply_memory_budget()
+
+        index_start = time.perf_counter()
+        print("🔄 Encoding dataset questions...")
+        # Length-sorted batches, optionally across worker processes
+        embeddings, encode_stats = encode_texts(
+            self.embedder, self.questions, batch_size=self.encode_batch_size, workers=self.encode_workers
+        )
+        self.timeline.note("encode", encode_stats)
+        # Normalise rows so cosine similarity is a single matrix-vector product
+        self.q_embeddings = normalize_rows(embeddings)
+        del embeddings
+
+        if self.multilingual:
+            # One vector per cross-language group (see multilingual.py)
+            self.index_embeddings, self.index_rows, self.row_groups, self.translations = build_multilingual_index(
+                self.embedder, self.q_embeddings, self.questions, self.answers, self.diseases,
+                self.row_collections, self.disease_names_dirs,
+                batch_size=self.encode_batch_size, workers=self.encode_workers,
+                min_answer_similarity=self.multilingual_min_answer_similarity,
+            )
+            self.index_mode = "multilingual"
+            print(f"✅ Built multilingual index: {len(self.index_rows)} vectors for {len(self.questions)} questions")
+        else:
+            # One vector per row, or per distinct answer
+            self.index_embeddings, self.index_rows = build_answer_index(
+                self.q_embeddings, self.answers, mode=self.index_mode, medoids_per_group=self.medoids_per_group
+            )
+        if self.index_mode in ("centroid", "medoid"):
+            print(f"✅ Built {self.index_mode} index: {len(self.index_rows)} vectors for {len(self.questions)} questions")
+        # Per-disease representatives for two-stage search
+        if self.retrieval_mode == "hierarchical":
+            self.disease_labels, self.disease_embeddings, self.disease_members = build_disease_index(
+                self.index_embeddings, [self.diseases[row] for row in self.index_rows]
+            )
+            print(f"✅ Built disease index: {len(self.disease_labels)} diseases")
+
+        if self.memory_budget_mb > 0 and self.index_mode in ("centroid", "medoid"):
+            # Only representative rows can be returned; drop metadata for the rest
+            # (multilingual mode keeps every row for the translations)
+            self.keep_rows(self.index_rows)
+            self.index_rows = np.arange(len(self.index_rows), dtype=np.int32)
+        self.index_embeddings = compact_embeddings(self.index_embeddings, self.index_precision)
+        if self.index_embeddings is not self.q_embeddings:
+            # The per-question matrix is no longer needed for search
+            self.q_embeddings = None
+        self.metadata_bytes = strings_nbytes(self.questions, self.answers, self.diseases, self.row_collections)
+        gc.collect()
+        self.timeline.record("index_build", index_start, time.perf_counter())
+        return True
+
+    def _name_entries(self, warn=False):
+        try:
+            return load_disease_names(self.disease_names_dirs)
+        except FileNotFoundError as e:
+            if warn:
+                print(f"⚠️  {e}; matching dataset disease labels only")
+            return None
+
+    def build_suggestions(self):
+        """Build the per-language typeahead index over questions and disease names"""
+        self.suggest_indexes = build_suggest_index(
+            self.questions, self.diseases, self.row_collections, self._name_entries()
+        )
+        sizes = ", ".join(f"{lang}: {len(index)}" for lang, index in sorted(self.suggest_indexes.items()))
+        print(f"✅ Built typeahead index ({sizes})")
+
+    def build_disease_matcher(self):
+        """Build the disease-name automaton and the index positions of each disease"""
+        self.disease_matcher = DiseaseMatcher(self.diseases, self.row_collections, self._name_entries(warn=True))
+        if self.translations:
+            # A cross-language group carries the disease label of every language
+            position_labels = [{self.diseases[row] for row in t.values()} for t in self.translations]
+        else:
+            position_labels = [[self.diseases[row]] for row in self.index_rows]
+        self.disease_positions = positions_by_disease(position_labels)
+        print(f"✅ Built disease-name matcher: {self.disease_matcher.size} names")
+
+    def build_payloads(self):
+        """Pre-encode the static JSON of every row's response (see payloads.py)"""
+        answer_languages = None
+        if self.translations:
+            answer_languages = [collection_language(c) for c in self.row_collections]
+        self.payloads = AnswerPayloads(self.questions, self.answers, self.diseases, answer_languages,
+                                       precompress=self.precompress_answers, answer_ids=self.source_rows)
+        print(f"✅ Pre-encoded {len(self.payloads)} response payloads "
+              f"({self.payloads.nbytes / MB:.1f} MB)")
+
+    def warm_up(self):
+        """
+        Warm the tokenizer and model on representative questions, settle the torch
+        thread count (see thread_tuning.py) and run one query end to end so the
+        first real request doesn't pay lazy-init costs
+        """
+        self.thread_report = tune_threads(self.encode, representative_queries(self.questions), self.thread_plan)
+        self.timeline.note("threads", self.thread_report)
+        print(describe(self.thread_report))
+        hit = self.retrieve(self.encode(self.questions[0]))
+        self.result_json(hit)
+
+    # =====================
+    # Search
+    # =====================
+    def encode(self, text):
+        """Embedding of one query (CPU, not kept as a tensor)"""
+        return self.embedder.encode(text, convert_to_tensor=False, show_progress_bar=False)
+
+    def retrieve(self, query_emb, positions=None):
+        """
+        Find the best matching dataset row for an encoded query.
+        The hit is language independent (and cached); build_result formats it.
+        """
+        disease_confidence = None
+        if positions is not None:
+            # Only the rows of a disease named in the query
+            best, scores = search(query_emb, self.index_embeddings[positions])
+            position, score = int(positions[best[0]]), float(scores[0])
+        elif self.disease_embeddings is not None:
+            position, score, _, disease_confidence = hierarchical_search(
+                query_emb, self.index_embeddings, self.disease_embeddings, self.disease_members, self.top_diseases
+            )
+        else:
+            best, scores = search(query_emb, self.index_embeddings)
+            position, score = int(best[0]), float(scores[0])
+        return self._hit(position, score, positions is not None, disease_confidence)
+
+    def _hit(self, position, score, filtered=False, disease_confidence=None):
+        hit = {"row": int(self.index_rows[position]), "similarity_score": float(score)}
+        if filtered:
+            hit["matched_by"] = "disease_filter"
+        if disease_confidence is not None:
+            hit["disease_confidence"] = disease_confidence
+        return hit
+
+    def result_row(self, hit, language="en"):
+        """Dataset row answering a hit, in the requested language when a translation exists"""
+        row = hit["row"]
+        if self.translations:
+            row = translated_row(self.translations[self.row_groups[row]], language)
+        return row
+
+    def build_result(self, hit, language="en"):
+        """Response fields for a hit"""
+        row = self.result_row(hit, language)
+        result = {
+            "response": self.answers[row],
+            "detected_disease": self.diseases[row],
+            "matched_question": self.questions[row],
+            "similarity_score": hit["similarity_score"],
+        }
+        if "disease_confidence" in hit:
+            # Similarity of the query to the detected disease's representative vector
+            result["disease_confidence"] = hit["disease_confidence"]
+        if "matched_by" in hit:
+            result["matched_by"] = hit["matched_by"]
+        if self.translations:
+            result["answer_language"] = collection_language(self.row_collections[row])
+        return result
+
+    def result_json(self, hit, language="en", fields=None):
+        """
+        build_result() plus the `fields` dict as UTF-8 JSON bytes: the row's
+        pre-encoded static fields with only the score and `fields` serialised
+        per request
+        """
+        dynamic = {"similarity_score": hit["similarity_score"]}
+        for key in ("disease_confidence", "matched_by"):
+            if key in hit:
+                dynamic[key] = hit[key]
+        dynamic.update(fields or {})
+        return self.payloads.response(self.result_row(hit, language), dynamic)
+
+    def match_disease(self, text):
+        """
+        Disease-name fast path. Returns (hit, positions): a hit when the query is a
+        bare disease name (answered without encoding), else the index positions to
+        restrict the search to, or (None, None) when no disease is named.
+        """
+        match = self.disease_matcher.match(text) if self.disease_matcher is not None else None
+        positions = candidate_positions(match, self.disease_positions) if match else None
+        if positions is None:
+            return None, None
+        if match["name_only"]:
+            self.disease_match_counts["name_only"] += 1
+            # The disease's first row (usually its symptoms) stands in for the whole disease
+            return {"row": int(self.index_rows[positions[0]]), "similarity_score": 1.0,
+                    "matched_by": "disease_name"}, None
+        self.disease_match_counts["filtered"] += 1
+        return None, positions
+
+    def _fast_hit(self, text):
+        # Cache first, then the disease-name fast path; returns (hit, positions)
+        hit = self.query_cache.get(text)
+        if hit is not None:
+            return hit, None
+        return self.match_disease(text)
+
+    def _check_ready(self):
+        if not self.ready:
+            raise RuntimeError("Chatbot model is not loaded. Call load() first.")
+
+    def query(self, text, language="en", admit=None):
+        """Answer one question; returns the response fields"""
+        return self.build_result(self.query_hit(text, admit), language)
+
+    def query_json(self, text, language="en", admit=None, fields=None):
+        """Answer one question as response JSON bytes (see result_json)"""
+        return self.result_json(self.query_hit(text, admit), language, fields)
+
+    def query_hit(self, text, admit=None):
+        """
+        Language-independent hit for one question.
+        admit(questions) optionally returns a context manager held around the
+        model call (see admission.py); cache hits and bare disease names never
+        enter it.
+        """
+        self._check_ready()
+        # Reuse the result of an identical or near-identical recent query
+        hit, positions = self._fast_hit(text)
+        if hit is None:
+            with admit(1) if admit else nullcontext():
+                start = time.perf_counter()
+                query_emb = self.encode(text)
+                encoded = time.perf_counter()
+                hit = self.query_cache.get_similar(text, query_emb)
+                if hit is None:
+                    searching = time.perf_counter()
+                    hit = self.retrieve(query_emb, positions)
+                    self.query_cache.put(text, query_emb, hit,
+                                         encode_seconds=encoded - start,
+                                         search_seconds=time.perf_counter() - searching)
+        return hit
+
+    def query_batch(self, texts, languages=None, batch_size=None, admit=None):
+        """Answer many questions at once; results keep the input order"""
+        languages = languages or ["en"] * len(texts)
+        hits = self.query_hits(texts, batch_size, admit)
+        return [self.build_result(hit, language) for hit, language in zip(hits, languages)]
+
+    def query_hits(self, texts, batch_size=None, admit=None):
+        """
+        Hits for many questions. Questions the cache or fast path cannot answer
+        are encoded together in batches and searched with one matrix product
+        (flat retrieval). admit is called with the number of questions needing
+        the model, as in query_hit().
+        """
+        self._check_ready()
+        hits = [None] * len(texts)
+        pending, pending_positions = [], []
+        for i, text in enumerate(texts):
+            hits[i], positions = self._fast_hit(text)
+            if hits[i] is None:
+                pending.append(i)
+                pending_positions.append(positions)
+
+        if pending:
+            with admit(len(pending)) if admit else nullcontext():
+                start = time.perf_counter()
+                query_embs = self.embedder.encode(
+                    [texts[i] for i in pending], batch_size=batch_size or self.encode_batch_size,
+                    convert_to_tensor=False, show_progress_bar=False,
+                )
+                encoded = time.perf_counter()
+                encode_seconds = (encoded - start) / len(pending)
+
+                unfiltered = []
+                for k, i in enumerate(pending):
+                    hits[i] = self.query_cache.get_similar(texts[i], query_embs[k])
+                    if hits[i] is None:
+                        if pending_positions[k] is None and self.disease_embeddings is None:
+                            unfiltered.append(k)
+                        else:
+                            hits[i] = self.retrieve(query_embs[k], pending_positions[k])
+                if unfiltered:
+                    # Flat search for the rest in one matrix product
+                    positions, scores = search_batch(query_embs[unfiltered], self.index_embeddings)
+                    for k, position, score in zip(unfiltered, positions, scores):
+                        hits[pending[k]] = self._hit(position, score)
+                search_seconds = (time.perf_counter() - encoded) / len(pending)
+                for k, i in enumerate(pending):
+                    self.query_cache.put(texts[i], query_embs[k], hits[i],
+                                         encode_seconds=encode_seconds, search_seconds=search_seconds)
+        return hits
+
+    def suggest(self, prefix, language="en", limit=8):
+        """Typeahead completions for a partially typed question (no model call)"""
+        index = self.suggest_indexes.get(language) or self.suggest_indexes.get("en")
+        return index.complete(prefix, limit) if index is not None else []
+
+    # =====================
+    # Reporting
+    # =====================
+    def memory_breakdown(self):
+        """Per-structure memory usage in MB"""
+        arrays = (self.index_embeddings, self.index_rows, self.disease_embeddings)
+        embeddings_bytes = sum(m.nbytes for m in arrays if m is not None)
+        if self.q_embeddings is not None and self.q_embeddings is not self.index_embeddings:
+            embeddings_bytes += self.q_embeddings.nbytes
+        return {
+            "model_weights_mb": round(self.model_bytes / MB, 2),
+            "embeddings_mb": round(embeddings_bytes / MB, 2),
+            "metadata_mb": round(self.metadata_bytes / MB, 2),
+            "query_cache_mb": round(self.query_cache.nbytes / MB, 2),
+            "response_payloads_mb": round(0 if self.payloads is None else self.payloads.nbytes / MB, 2),
+            "process_rss_mb": round(process_rss_bytes() / MB, 2),
+            "budget_mb": self.memory_budget_mb or None,
+            "over_budget": bool(self.memory_plan and self.memory_plan["over_budget"]),
+            "index_mode": self.index_mode,
+            "precision": self.index_precision,
+        }
+
+    def metrics(self):
+        """Query cache hit rate and disease fast path counts"""
+        return {
+            "query_cache": self.query_cache.stats(),
+            "disease_match": dict(self.disease_match_counts),
+            "threads": self.thread_report,
+        }
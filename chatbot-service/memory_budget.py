@@ -0,0 +1,214 @@
+"""
+Memory budget helpers for the Veterinary Chatbot API
+
+Measures what the model and dataset occupy at startup and picks the index
+layout (precision, centroid compaction, stratified row sampling) that fits
+MEMORY_BUDGET_MB.
+"""
+
+import os
+import sys
+from collections import defaultdict
+
+PRECISIONS = ("float32", "float16", "int8")
+BYTES_PER_VALUE = {"float32": 4, "float16": 2, "int8": 1}
+MB = 1024 ** 2
+
+
+# =====================
+# Measurement
+# =====================
+def process_rss_bytes():
+    """
+    Current resident set size of this process: psutil if installed, else
+    /proc/self/statm (Linux), else peak RSS as a last resort
+    """
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            # Second field: resident pages
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        # ru_maxrss is the peak, in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def model_nbytes(model):
+    """Bytes held by a torch module's parameters and buffers"""
+    total = sum(p.numel() * p.element_size() for p in model.parameters())
+    total += sum(b.numel() * b.element_size() for b in model.buffers())
+    return total
+
+
+def strings_nbytes(*lists):
+    """Bytes held by lists of strings, counting each distinct string object once"""
+    seen = set()
+    total = 0
+    for values in lists:
+        total += sys.getsizeof(values)
+        for value in values:
+            if id(value) not in seen:
+                seen.add(id(value))
+                total += sys.getsizeof(value)
+    return total
+
+
+# =====================
+# Stratified sampling
+# =====================
+def stratified_sample(row_collections, diseases, answers, max_size):
+    """
+    Pick max_size rows spread proportionally over (collection, disease) strata.
+
+    Every stratum keeps at least one row when max_size allows it, and within a
+    stratum rows are taken round-robin across distinct answers so paraphrases
+    are dropped before answers are. Returns sorted row numbers.
+    """
+    n = len(diseases)
+    if max_size <= 0 or max_size >= n:
+        return list(range(n))
+
+    strata = defaultdict(list)
+    for row in range(n):
+        strata[(row_collections[row], diseases[row])].append(row)
+    quotas = _stratum_quotas(strata, max_size)
+
+    chosen = []
+    for key, rows in strata.items():
+        by_answer = defaultdict(list)
+        for row in rows:
+            by_answer[answers[row]].append(row)
+        # Round-robin: first paraphrase of every answer, then the second, ...
+        ordered = []
+        depth = 0
+        while len(ordered) < len(rows):
+            for members in by_answer.values():
+                if depth < len(members):
+                    ordered.append(members[depth])
+            depth += 1
+        chosen.extend(ordered[:quotas[key]])
+    return sorted(chosen)
+
+
+def stratified_group_sample(row_collections, diseases, groups, max_groups):
+    """
+    Pick max_groups answer groups (lists of rows sharing an answer) spread
+    proportionally over (collection, disease) strata, each group counted in the
+    stratum of its first row. Every stratum keeps at least one group when
+    max_groups allows it. Returns the sorted rows of the chosen groups.
+    """
+    if max_groups <= 0 or max_groups >= len(groups):
+        return list(range(len(diseases)))
+
+    strata = defaultdict(list)
+    for group in groups:
+        strata[(row_collections[group[0]], diseases[group[0]])].append(group)
+    quotas = _stratum_quotas(strata, max_groups)
+
+    chosen = []
+    for key, members in strata.items():
+        for group in members[:quotas[key]]:
+            chosen.extend(group)
+    return sorted(chosen)
+
+
+def strata_count(row_collections, diseases, groups):
+    """Number of (collection, disease) strata that stratified_group_sample can cover"""
+    return len({(row_collections[group[0]], diseases[group[0]]) for group in groups})
+
+
+def _stratum_quotas(strata, max_size):
+    """Items per stratum, proportional to stratum size (largest remainder first), at least one each when possible"""
+    n = sum(len(items) for items in strata.values())
+    exact = {key: max_size * len(items) / n for key, items in strata.items()}
+    quotas = {key: int(value) for key, value in exact.items()}
+    if max_size >= len(strata):
+        for key in quotas:
+            quotas[key] = max(quotas[key], 1)
+    leftover = max_size - sum(quotas.values())
+    for key in sorted(exact, key=lambda k: exact[k] - int(exact[k]), reverse=True):
+        if leftover <= 0:
+            break
+        if quotas[key] < len(strata[key]):
+            quotas[key] += 1
+            leftover -= 1
+    # Minimum-one quotas can overshoot on many tiny strata; trim the largest
+    while sum(quotas.values()) > max_size:
+        largest = max(quotas, key=quotas.get)
+        quotas[largest] -= 1
+    return quotas
+
+
+# =====================
+# Layout planning
+# =====================
+def index_nbytes(vectors, dim, precision):
+    """Bytes for an index of `vectors` rows: embeddings, int8 scales and row map"""
+    total = vectors * dim * BYTES_PER_VALUE[precision] + vectors * 4
+    if precision == "int8":
+        total += vectors * 4
+    return total
+
+
+def plan_layout(budget_bytes, fixed_bytes, n_rows, n_groups, dim, metadata_bytes,
+                index_mode="question", medoids_per_group=2, min_groups=1):
+    """
+    Choose the most accurate layout whose index and metadata fit in what is left
+    of the budget after fixed_bytes (process RSS with the model loaded).
+
+    Preference order: full precision first, then lower precision, then one
+    vector per answer (centroid), then keeping only max_groups answer groups
+    (see stratified_group_sample), so the estimate counts the centroids that are
+    actually kept. Sampling never goes below min_groups (one group per
+    collection and disease): a budget that cannot hold that many centroids is
+    reported with over_budget=True instead.
+    Returns a dict with index_mode, precision, max_groups and estimated_bytes.
+    """
+    available = budget_bytes - fixed_bytes
+    per_row_metadata = metadata_bytes / max(n_rows, 1)
+
+    modes = [index_mode]
+    if index_mode != "centroid":
+        modes.append("centroid")
+    vectors_for = {
+        "question": n_rows,
+        "medoid": min(n_rows, n_groups * medoids_per_group),
+        "centroid": n_groups,
+    }
+
+    for mode in modes:
+        vectors = vectors_for[mode]
+        # Compact modes only keep metadata for the representative rows
+        metadata = metadata_bytes if mode == "question" else per_row_metadata * vectors
+        for precision in PRECISIONS:
+            needed = index_nbytes(vectors, dim, precision) + metadata
+            if needed <= available:
+                return {
+                    "index_mode": mode,
+                    "precision": precision,
+                    "max_groups": n_groups,
+                    "estimated_bytes": int(needed),
+                    "available_bytes": int(available),
+                    "over_budget": False,
+                }
+
+    # Still too big: keep as many answer groups as fit as int8 centroids
+    per_group = index_nbytes(1, dim, "int8") + per_row_metadata
+    max_groups = min(int(available / per_group), n_groups) if available > 0 else 0
+    over_budget = max_groups < min_groups
+    if over_budget:
+        # Keep every (collection, disease) covered and report the overshoot
+        max_groups = min(min_groups, n_groups)
+    return {
+        "index_mode": "centroid",
+        "precision": "int8",
+        "max_groups": max_groups,
+        "estimated_bytes": int(per_group * max_groups),
+        "available_bytes": int(available),
+        "over_budget": over_budget,
+    }
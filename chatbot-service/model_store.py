@@ -0,0 +1,146 @@
+"""
+Local model store for the Veterinary Chatbot API
+
+Saves the Sentence Transformer model into a directory with a SHA-256 manifest
+(run at image build time) and loads it back with Hugging Face Hub access
+disabled, so a fresh container never downloads the model. The directory also
+records which model it holds, so a MODEL_DIR baked for one model is not used
+for another (e.g. the English image with MULTILINGUAL=1).
+
+Usage (build time):
+    python model_store.py --model all-MiniLM-L6-v2 --output models/all-MiniLM-L6-v2
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from contextlib import nullcontext
+
+MANIFEST_NAME = "checksums.json"
+MODEL_INFO_NAME = "model_store.json"
+
+
+def _sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _model_files(model_dir):
+    for root, _, files in os.walk(model_dir):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            rel = os.path.relpath(path, model_dir)
+            if rel != MANIFEST_NAME:
+                yield rel, path
+
+
+def write_manifest(model_dir):
+    """Record the SHA-256 of every file in model_dir"""
+    checksums = {rel: _sha256(path) for rel, path in _model_files(model_dir)}
+    with open(os.path.join(model_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(checksums, f, indent=2, sort_keys=True)
+    return checksums
+
+
+def verify_manifest(model_dir):
+    """Raise ValueError if any file listed in the manifest is missing or changed"""
+    manifest_path = os.path.join(model_dir, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        raise ValueError(f"No {MANIFEST_NAME} in {model_dir}. Rebuild it with model_store.py")
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        expected = json.load(f)
+    for rel, checksum in expected.items():
+        path = os.path.join(model_dir, rel)
+        if not os.path.exists(path):
+            raise ValueError(f"Model file missing: {rel}")
+        if _sha256(path) != checksum:
+            raise ValueError(f"Checksum mismatch for model file: {rel}")
+    return len(expected)
+
+
+def _short_name(model_name):
+    # "sentence-transformers/all-MiniLM-L6-v2" and "all-MiniLM-L6-v2" are the same model
+    return model_name.rstrip("/").removeprefix("sentence-transformers/")
+
+
+def write_model_info(model_dir, model_name):
+    """Record the name of the model saved in model_dir"""
+    with open(os.path.join(model_dir, MODEL_INFO_NAME), "w", encoding="utf-8") as f:
+        json.dump({"model_name": model_name}, f, indent=2)
+
+
+def saved_model_name(model_dir):
+    """Name of the model saved in model_dir, or None for directories saved without it"""
+    path = os.path.join(model_dir, MODEL_INFO_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("model_name")
+
+
+def check_model_dir(model_dir, model_name):
+    """Raise ValueError if model_dir holds a different model than model_name"""
+    saved = saved_model_name(model_dir)
+    if saved is None:
+        print(f"⚠️  {model_dir} does not record which model it holds; assuming {model_name}. "
+              f"Rebuild it with model_store.py to have this checked")
+    elif _short_name(saved) != _short_name(model_name):
+        raise ValueError(
+            f"MODEL_DIR {model_dir} holds {saved}, but {model_name} is configured. "
+            f"Save {model_name} with model_store.py (Docker: --build-arg EMBED_MODEL={_short_name(model_name)}) "
+            f"or unset MODEL_DIR"
+        )
+
+
+def load_embedder(model_name, model_dir=None, verify=True, timeline=None, before_load=None):
+    """
+    Load the Sentence Transformer model on CPU.
+
+    With model_dir set, the model is loaded from that directory (checked against
+    its manifest and the configured model_name) and Hugging Face Hub access is
+    disabled. The heavy
+    sentence-transformers/torch import happens here, not at module import.
+    before_load, if given, runs right after that import (in the model_imports
+    phase) and before the model is built, e.g. to size torch's thread pools.
+    """
+    if model_dir:
+        check_model_dir(model_dir, model_name)
+        # Must be set before huggingface_hub is imported
+        os.environ["HF_HUB_OFFLINE"] = "1"
+        os.environ["TRANSFORMERS_OFFLINE"] = "1"
+        if verify:
+            count = verify_manifest(model_dir)
+            print(f"✅ Verified {count} model files in {model_dir}")
+
+    def step(name):
+        return timeline.phase(name) if timeline is not None else nullcontext()
+
+    with step("model_imports"):
+        from sentence_transformers import SentenceTransformer
+        if before_load is not None:
+            before_load()
+    with step("model_load"):
+        return SentenceTransformer(model_dir or model_name, device="cpu")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="Model name on the Hugging Face Hub")
+    parser.add_argument("--output", required=True, help="Directory to save the model into")
+    args = parser.parse_args()
+
+    from sentence_transformers import SentenceTransformer
+
+    print(f"🔄 Downloading {args.model}...")
+    SentenceTransformer(args.model, device="cpu").save(args.output)
+    write_model_info(args.output, args.model)
+    checksums = write_manifest(args.output)
+    print(f"✅ Saved {args.model} to {args.output} ({len(checksums)} files checksummed)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Cross-language answer groups for the Veterinary Chatbot API
+
+The dataset stores translated copies of the same content in separate
+collections (cowAndBuffalo / cowAndBuffaloTamil, ...). Disease names are
+linked across languages with the tables written by process_disease_names.py
+(cowAndBuffalo.json, poultryBirds.json, sheepGoat.json), and rows about the
+same disease and question intent are merged into one group. With a
+multilingual encoder each group is indexed once and the answer is returned in
+the requested language.
+
+The name tables are aligned by file position across languages and are not
+always right, so a cross-language merge can be confirmed by comparing the two
+answers in the multilingual embedding space (see build_translation_groups).
+"""
+
+import json
+import os
+import re
+from collections import OrderedDict
+
+import numpy as np
+
+from query_cache import normalize_query
+from retrieval import normalize_rows
+
+DISEASE_NAME_FILES = ("cowAndBuffalo.json", "poultryBirds.json", "sheepGoat.json")
+LANGUAGES = ("en", "ta", "ml", "hi")
+
+# Dataset collection -> (category used in the name tables, language)
+COLLECTION_LANGUAGES = {
+    "cowAndBuffalo": ("CowAndBuffalo", "en"),
+    "cowAndBuffaloTamil": ("CowAndBuffalo", "ta"),
+    "cowAndBuffaloMalayalam": ("CowAndBuffalo", "ml"),
+    "cowAndBuffaloHindi": ("CowAndBuffalo", "hi"),
+    "PoultryBirds": ("PoultryBirds", "en"),
+    "PoultryBirdsTamil": ("PoultryBirds", "ta"),
+    "PoultryBirdsMalayalam": ("PoultryBirds", "ml"),
+    "PoultryBirdsHindi": ("PoultryBirds", "hi"),
+    "SheepGoat": ("SheepGoat", "en"),
+    "SheepGoatTamil": ("SheepGoat", "ta"),
+    "SheepGoatMalayalam": ("SheepGoat", "ml"),
+    "SheepGoatHindi": ("SheepGoat", "hi"),
+}
+
+_PARENTHESES = re.compile(r"\([^)]*\)")
+
+
+def normalize_name(text):
+    """
+    Normalise a disease name for matching: case-fold, drop parenthesised
+    glosses such as "(Mastitis)", punctuation and trailing colons.
+    """
+    return normalize_query(_PARENTHESES.sub(" ", text))
+
+
+def load_disease_names(search_dirs):
+    """Load the disease name tables from the first directory that has them"""
+    for directory in search_dirs:
+        paths = [os.path.join(directory, name) for name in DISEASE_NAME_FILES]
+        if all(os.path.exists(path) for path in paths):
+            entries = []
+            for path in paths:
+                with open(path, "r", encoding="utf-8") as f:
+                    entries.extend(json.load(f))
+            return entries
+    raise FileNotFoundError(
+        f"Disease name files {DISEASE_NAME_FILES} not found in any of: {', '.join(search_dirs)}"
+    )
+
+
+class DiseaseNameTable:
+    """Resolves a disease name in any language to its (category, id)"""
+
+    def __init__(self, entries):
+        self.entries = {(e["category"], e["id"]): e for e in entries}
+        self._exact = {}
+        self._by_category = {}
+        for e in entries:
+            for lang, name in e.get("names", {}).items():
+                key = normalize_name(name or "")
+                if not key:
+                    continue
+                self._exact.setdefault((e["category"], key), e["id"])
+                self._by_category.setdefault(e["category"], []).append((key, e["id"]))
+
+    def resolve(self, category, name):
+        """
+        Return the disease id for a name, or None.
+        Tries an exact normalised match, then containment (the dataset often
+        shortens or extends the extracted title). Looser token overlap is not
+        used: it links unrelated diseases that share words like "disease".
+        """
+        key = normalize_name(name)
+        if not key:
+            return None
+        found = self._exact.get((category, key))
+        if found is not None:
+            return found
+        for other, disease_id in self._by_category.get(category, []):
+            if min(len(key), len(other)) >= 4 and (key in other or other in key):
+                return disease_id
+        return None
+
+    def name(self, category, disease_id, language):
+        entry = self.entries.get((category, disease_id))
+        return (entry or {}).get("names", {}).get(language) or None
+
+
+def _answer_groups(answers, row_collections):
+    """Rows sharing an answer within a collection, in dataset order"""
+    groups = OrderedDict()
+    for row, answer in enumerate(answers):
+        groups.setdefault((row_collections[row], answer.strip()), []).append(row)
+    return groups
+
+
+def answer_group_rows(answers, row_collections):
+    """First row of every (collection, answer) group, for encoding answers once"""
+    return [rows[0] for rows in _answer_groups(answers, row_collections).values()]
+
+
+def build_translation_groups(questions, answers, diseases, row_collections, name_table,
+                             answer_vectors=None, min_answer_similarity=0.6):
+    """
+    Merge rows into cross-language groups keyed on (category, disease id,
+    question intent, ordinal). The intent is the question template with the
+    disease name removed; the ordinal separates diseases with several
+    treatments. Rows whose disease cannot be resolved keep a group of their own
+    answer.
+
+    answer_vectors optionally maps a row (see answer_group_rows) to its
+    normalised answer embedding; a row only joins a group in another language
+    when its answer is at least min_answer_similarity to the group's answer.
+
+    Returns (row_groups, translations): row_groups[i] is the group of row i and
+    translations[g] maps language -> representative row of group g.
+    """
+    answer_groups = _answer_groups(answers, row_collections)
+
+    group_of_key = {}
+    ordinals = {}
+    translations = []
+    row_groups = [0] * len(answers)
+    for (collection, answer), rows in answer_groups.items():
+        category, language = COLLECTION_LANGUAGES.get(collection, (collection, "en"))
+        disease = diseases[rows[0]]
+        disease_id = name_table.resolve(category, disease)
+        if disease_id is None:
+            key = ("unresolved", collection, answer)
+        else:
+            intent = min(questions[r].replace(diseases[r], "{}") for r in rows)
+            base = (category, disease_id, intent)
+            ordinal = ordinals.get((base, language), 0)
+            ordinals[(base, language)] = ordinal + 1
+            key = base + (ordinal,)
+
+        group = group_of_key.get(key)
+        if group is not None and answer_vectors is not None:
+            anchor = next(iter(translations[group].values()))
+            if float(answer_vectors[anchor] @ answer_vectors[rows[0]]) < min_answer_similarity:
+                # The name tables disagree with the content; keep this answer separate
+                group, key = None, ("unconfirmed", collection, answer)
+        if group is None:
+            group = len(translations)
+            group_of_key[key] = group
+            translations.append({})
+        translations[group].setdefault(language, rows[0])
+        for r in rows:
+            row_groups[r] = group
+    return row_groups, translations
+
+
+def build_group_index(embeddings, row_groups, translations):
+    """
+    One normalised centroid per cross-language group over the row embeddings of
+    every language. Returns (index_embeddings, index_rows) with the English row
+    (or the first available) as each group's representative.
+    """
+    row_groups = np.asarray(row_groups)
+    sums = np.zeros((len(translations), embeddings.shape[1]), dtype=np.float32)
+    np.add.at(sums, row_groups, embeddings)
+    index_rows = np.array([translated_row(t, "en") for t in translations], dtype=np.int32)
+    return normalize_rows(sums), index_rows
+
+
+def collection_language(collection):
+    """Language code of a dataset collection ("en" when unknown)"""
+    return COLLECTION_LANGUAGES.get(collection, (collection, "en"))[1]
+
+
+def build_multilingual_index(embedder, embeddings, questions, answers, diseases, row_collections,
+                             search_dirs, batch_size=32, workers=1, min_answer_similarity=0.6,
+                             answer_chars=300):
+    """
+    Build the shared cross-language index from normalised question embeddings.
+
+    Each distinct answer is encoded once (first answer_chars characters) to
+    confirm cross-language merges. Returns (index_embeddings, index_rows,
+    row_groups, translations).
+    """
+    from parallel_encode import encode_texts
+
+    name_table = DiseaseNameTable(load_disease_names(search_dirs))
+    rows = answer_group_rows(answers, row_collections)
+    vectors, _ = encode_texts(
+        embedder, [answers[r][:answer_chars] for r in rows], batch_size=batch_size, workers=workers
+    )
+    answer_vectors = dict(zip(rows, normalize_rows(vectors)))
+    row_groups, translations = build_translation_groups(
+        questions, answers, diseases, row_collections, name_table,
+        answer_vectors=answer_vectors, min_answer_similarity=min_answer_similarity,
+    )
+    index_embeddings, index_rows = build_group_index(embeddings, row_groups, translations)
+    return index_embeddings, index_rows, np.asarray(row_groups, dtype=np.int32), translations
+
+
+def translated_row(translations, language, fallback="en"):
+    """Pick the row of a group in the requested language, else the fallback, else any"""
+    if language in translations:
+        return translations[language]
+    if fallback in translations:
+        return translations[fallback]
+    return next(iter(translations.values()))
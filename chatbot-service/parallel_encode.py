@@ -0,0 +1,113 @@
+"""
+Dataset encoding for index builds
+
+Texts are sorted by token length so each batch pads to a similar length, then
+encoded either in-process or across a pool of CPU worker processes. Results are
+written back in the original order.
+
+Workers are forked from the loading process and share its model (copy-on-write),
+so the model is not reloaded per worker. Each worker runs torch with a single
+thread, which keeps forking safe with OpenMP and lets the pool scale with cores.
+Forking is only used on Linux; elsewhere encoding stays in-process.
+"""
+
+import multiprocessing as mp
+import os
+import sys
+import time
+
+import numpy as np
+
+_worker_model = None
+
+
+def _init_worker():
+    import torch
+    torch.set_num_threads(1)
+
+
+def _encode_batch(args):
+    positions, texts = args
+    return positions, _worker_model.encode(
+        texts, batch_size=len(texts), convert_to_tensor=False, show_progress_bar=False
+    )
+
+
+def length_sorted_order(texts, tokenizer=None):
+    """Row order that sorts texts by token length (character length without a tokenizer)"""
+    if tokenizer is not None:
+        lengths = [len(tokenizer.tokenize(text)) for text in texts]
+    else:
+        lengths = [len(text) for text in texts]
+    return np.argsort(lengths, kind="stable")
+
+
+def default_workers():
+    """ENCODE_WORKERS from the environment; 0 means one per CPU core"""
+    workers = int(os.environ.get("ENCODE_WORKERS", "1"))
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def encode_texts(embedder, texts, batch_size=64, workers=1):
+    """
+    Encode texts with length-sorted batches, optionally across worker processes.
+    Returns (embeddings, stats) with embeddings in the original text order.
+    """
+    global _worker_model
+
+    start = time.perf_counter()
+    n = len(texts)
+    order = length_sorted_order(texts, getattr(embedder, "tokenizer", None))
+    batches = [
+        (order[i:i + batch_size], [texts[j] for j in order[i:i + batch_size]])
+        for i in range(0, n, batch_size)
+    ]
+    embeddings = np.empty((n, embedder.get_sentence_embedding_dimension()), dtype=np.float32)
+
+    if workers > 1 and not sys.platform.startswith("linux"):
+        print("⚠️  Multi-process encoding needs Linux fork; encoding in-process")
+        workers = 1
+    workers = max(1, min(workers, len(batches)))
+
+    done = 0
+    if workers == 1:
+        results = (_encode_in_process(embedder, batch) for batch in batches)
+        for positions, batch_embeddings in results:
+            embeddings[positions] = batch_embeddings
+            done = _report_progress(done, len(positions), n)
+    else:
+        _worker_model = embedder
+        try:
+            with mp.get_context("fork").Pool(workers, initializer=_init_worker) as pool:
+                for positions, batch_embeddings in pool.imap_unordered(_encode_batch, batches):
+                    embeddings[positions] = batch_embeddings
+                    done = _report_progress(done, len(positions), n)
+        finally:
+            _worker_model = None
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        "rows": n,
+        "workers": workers,
+        "batch_size": batch_size,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(n / elapsed, 1) if elapsed > 0 else None,
+    }
+    print(f"✅ Encoded {n} texts in {elapsed:.1f}s "
+          f"({stats['rows_per_sec']} rows/sec, {workers} worker(s), batch {batch_size})")
+    return embeddings, stats
+
+
+def _encode_in_process(embedder, batch):
+    positions, texts = batch
+    return positions, embedder.encode(
+        texts, batch_size=len(texts), convert_to_tensor=False, show_progress_bar=False
+    )
+
+
+def _report_progress(done, added, total, every=1000):
+    # Progress every `every` rows instead of every batch
+    now = done + added
+    if now == total or now // every > done // every:
+        print(f"   Encoded {now}/{total} texts...")
+    return now
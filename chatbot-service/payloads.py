@@ -0,0 +1,98 @@
+"""
+Pre-encoded JSON response payloads for the Veterinary Chatbot API
+
+Answers repeat across hundreds of paraphrased questions and are long
+multilingual strings, so serialising them again on every request is wasted
+work. At load time the static fields of each row's response (answer id,
+answer, disease, matched question and, in multilingual mode, the answer
+language) are encoded once as UTF-8 JSON fragments, with each distinct answer
+encoded once. A /chat response is that fragment with the per-request fields
+(score, status, language) spliced in.
+
+GET /answer/<id> serves a row's static record as a cacheable body with a
+content ETag. The id is the row's position in the dataset file, not in the
+loaded (possibly sampled) rows, so it means the same record on every worker
+and after restarts. Its gzip variant is compressed on first request, or at load with
+precompress=True, and kept.
+"""
+
+import gzip
+import hashlib
+import json
+
+import numpy as np
+
+
+def _member(key, value):
+    return json.dumps(key) + ":" + json.dumps(value, ensure_ascii=False)
+
+
+class AnswerPayloads:
+    """Static JSON fragments, ETags and gzip bodies for every dataset row"""
+
+    def __init__(self, questions, answers, diseases, answer_languages=None, precompress=False, answer_ids=None):
+        fragment_of_answer = {}
+        self._answers = []
+        self._answer_of_row = np.empty(len(answers), dtype=np.int32)
+        for row, answer in enumerate(answers):
+            fragment = fragment_of_answer.get(answer)
+            if fragment is None:
+                fragment = fragment_of_answer[answer] = len(self._answers)
+                self._answers.append(_member("response", answer).encode("utf-8"))
+            self._answer_of_row[row] = fragment
+
+        if answer_ids is None:
+            answer_ids = range(len(questions))
+        self._row_of_id = {int(answer_id): row for row, answer_id in enumerate(answer_ids)}
+        self._rows = []
+        for row, (question, disease, answer_id) in enumerate(zip(questions, diseases, answer_ids)):
+            fields = [_member("answer_id", int(answer_id)), _member("detected_disease", disease),
+                      _member("matched_question", question)]
+            if answer_languages is not None:
+                fields.append(_member("answer_language", answer_languages[row]))
+            self._rows.append(("," + ",".join(fields)).encode("utf-8"))
+
+        self._etags = [None] * len(self._rows)
+        self._gzipped = [None] * len(self._rows)
+        if precompress:
+            for row in range(len(self._rows)):
+                self.gzipped(row)
+
+    def __len__(self):
+        return len(self._rows)
+
+    @property
+    def nbytes(self):
+        return (sum(map(len, self._answers)) + sum(map(len, self._rows))
+                + sum(len(body) for body in self._gzipped if body is not None)
+                + self._answer_of_row.nbytes)
+
+    def row_of(self, answer_id):
+        """Loaded row carrying a public answer_id, or None when it is not loaded"""
+        return self._row_of_id.get(answer_id)
+
+    def _static(self, row):
+        return self._answers[self._answer_of_row[row]] + self._rows[row]
+
+    def response(self, row, fields):
+        """JSON bytes of a row's static fields followed by the per-request `fields` dict"""
+        dynamic = json.dumps(fields, ensure_ascii=False)[1:-1].encode("utf-8")
+        return b"{" + self._static(row) + (b"," + dynamic if dynamic else b"") + b"}"
+
+    def record(self, row):
+        """JSON bytes of a row's static fields alone (the GET /answer/<id> body)"""
+        return b"{" + self._static(row) + b"}"
+
+    def etag(self, row):
+        """Content hash of record(row), computed once"""
+        etag = self._etags[row]
+        if etag is None:
+            etag = self._etags[row] = hashlib.sha1(self.record(row)).hexdigest()[:20]
+        return etag
+
+    def gzipped(self, row):
+        """gzip of record(row), compressed once (mtime 0 keeps the bytes stable)"""
+        body = self._gzipped[row]
+        if body is None:
+            body = self._gzipped[row] = gzip.compress(self.record(row), mtime=0)
+        return body
@@ -0,0 +1,148 @@
+"""
+On-demand profiling for live Veterinary Chatbot API workers
+
+Nothing runs until a profile is asked for. For the requested seconds,
+/debug/profile reads every other thread's stack with sys._current_frames() at
+a fixed interval, from the request's own thread, and returns the counts in the
+collapsed format ("thread;frame;frame count" per line) that flamegraph.pl,
+speedscope and inferno render directly. /debug/memory turns tracemalloc on
+for the requested window and reports the lines holding the most memory
+allocated in it. Tracing is turned off again afterwards, so idle workers pay
+nothing.
+
+Both endpoints are off unless DEBUG_TOKEN is set, and callers must send it in
+the X-Debug-Token header.
+"""
+
+import hmac
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+# A thread whose innermost Python frame is in one of these files is waiting, not running
+_IDLE_FILES = ("threading.py", "selectors.py", "socketserver.py", "queue.py", "socket.py")
+
+# Per-request threads are numbered ("Thread-12 (process_request_thread)"); drop the
+# numbers so the same work merges into one flamegraph root
+_THREAD_NUMBER = re.compile(r"[-_]\d+")
+
+_busy = threading.Lock()
+
+
+class ProfilerBusy(RuntimeError):
+    """Another profile or memory trace is already running in this worker"""
+
+
+class NothingToSample(RuntimeError):
+    """The profiling request's thread is the worker's only thread (a sync worker)"""
+
+
+def token_matches(given, expected):
+    """Constant-time check of the X-Debug-Token header; False when no token is configured"""
+    return bool(expected) and bool(given) and hmac.compare_digest(given, expected)
+
+
+def _frame_label(code):
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def _stack(frame):
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+def sample_stacks(seconds, interval=0.005, include_idle=False):
+    """
+    Sample all other threads for `seconds`. Returns (Counter of collapsed
+    stacks, number of sampling rounds). Idle threads (waiting on a lock,
+    socket or queue) are left out unless include_idle.
+
+    Raises NothingToSample right away when the caller is the only thread: in
+    a single-threaded worker the sampler would block the only request slot
+    and see nothing.
+    """
+    caller = threading.get_ident()
+    if not any(ident != caller for ident in sys._current_frames()):
+        raise NothingToSample(
+            "This worker runs one request at a time, so there is nothing to sample while "
+            "the profile runs. Use a threaded server (gunicorn --worker-class gthread, or python app.py)"
+        )
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running in this worker")
+    try:
+        counts = Counter()
+        rounds = 0
+        names = {}
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == caller:
+                    continue
+                if not include_idle and os.path.basename(frame.f_code.co_filename) in _IDLE_FILES:
+                    continue
+                if ident not in names:
+                    names = {t.ident: _THREAD_NUMBER.sub("", t.name) for t in threading.enumerate()}
+                stack = [names.get(ident, f"thread-{ident}")] + _stack(frame)
+                counts[";".join(stack)] += 1
+            rounds += 1
+            time.sleep(interval)
+        return counts, rounds
+    finally:
+        _busy.release()
+
+
+def collapsed(counts):
+    """Collapsed-stack text, most frequent stacks first"""
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+
+def top_allocations(seconds, limit=20, frames=1):
+    """
+    Trace allocations for `seconds` (or take a snapshot right away when
+    tracemalloc is already on, e.g. via PYTHONTRACEMALLOC) and return the
+    source lines holding the most traced memory at the end.
+    """
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running in this worker")
+    try:
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start(frames)
+        try:
+            if started:
+                time.sleep(seconds)
+            snapshot = tracemalloc.take_snapshot()
+            traced, peak = tracemalloc.get_traced_memory()
+        finally:
+            if started:
+                tracemalloc.stop()
+    finally:
+        _busy.release()
+
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ))
+    stats = snapshot.statistics("traceback" if frames > 1 else "lineno")
+    return {
+        "seconds": seconds if started else 0,
+        "already_tracing": not started,
+        "traced_mb": traced / (1024 * 1024),
+        "peak_mb": peak / (1024 * 1024),
+        "top": [
+            {
+                "size_kb": stat.size / 1024,
+                "count": stat.count,
+                "traceback": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+            }
+            for stat in stats[:limit]
+        ],
+    }
@@ -0,0 +1,139 @@
+"""
+Near-duplicate query cache for the Veterinary Chatbot API
+
+Two tiers, both bounded:
+- exact: normalised query text -> result, skips encoding and search
+- semantic: a small matrix of recent query embeddings; a new query whose
+  embedding is at least `threshold` similar to a cached one reuses its result
+"""
+
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+from retrieval import normalize_rows
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _strip_punctuation(text):
+    # Keep letters, digits and combining marks: Tamil, Malayalam and Hindi vowel
+    # signs are marks, which a plain [^\w\s] would strip out of every word
+    return "".join(
+        char if char.isspace() or unicodedata.category(char)[0] in "LNM" else " " for char in text
+    )
+
+
+def normalize_query(text):
+    """Case-fold, drop punctuation and collapse whitespace"""
+    return _WHITESPACE.sub(" ", _strip_punctuation(text.casefold())).strip()
+
+
+class SemanticQueryCache:
+    """Bounded cache of recent query results keyed by text and by embedding"""
+
+    def __init__(self, capacity=256, threshold=0.95):
+        self.capacity = capacity
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._texts = OrderedDict()
+        self._matrix = None  # allocated on first put, once the embedding size is known
+        self._results = [None] * capacity
+        self._count = 0
+        self._next = 0
+        # Metrics
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._encode_seconds = 0.0
+        self._search_seconds = 0.0
+        self._timed_misses = 0
+
+    @property
+    def enabled(self):
+        return self.capacity > 0
+
+    @property
+    def nbytes(self):
+        return 0 if self._matrix is None else self._matrix.nbytes
+
+    def get(self, text):
+        """Exact tier lookup by normalised text"""
+        if not self.enabled:
+            return None
+        key = normalize_query(text)
+        with self._lock:
+            result = self._texts.get(key)
+            if result is not None:
+                self._texts.move_to_end(key)
+                self.exact_hits += 1
+            return result
+
+    def get_similar(self, text, query_emb):
+        """Semantic tier lookup; also promotes the text into the exact tier on a hit"""
+        if not self.enabled:
+            return None
+        query = normalize_rows(query_emb)[0]
+        with self._lock:
+            if self._count == 0:
+                self.misses += 1
+                return None
+            sims = self._matrix[:self._count] @ query
+            best = int(sims.argmax())
+            if sims[best] < self.threshold:
+                self.misses += 1
+                return None
+            result = self._results[best]
+            self.semantic_hits += 1
+            self._remember_text(normalize_query(text), result)
+            return result
+
+    def put(self, text, query_emb, result, encode_seconds=0.0, search_seconds=0.0):
+        """Store a freshly computed result and the cost it took to produce it"""
+        if not self.enabled:
+            return
+        query = normalize_rows(query_emb)[0]
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = np.zeros((self.capacity, len(query)), dtype=np.float32)
+            # Ring buffer: overwrite the oldest slot once full
+            self._matrix[self._next] = query
+            self._results[self._next] = result
+            self._next = (self._next + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+            self._remember_text(normalize_query(text), result)
+            self._encode_seconds += encode_seconds
+            self._search_seconds += search_seconds
+            self._timed_misses += 1
+
+    def _remember_text(self, key, result):
+        self._texts[key] = result
+        self._texts.move_to_end(key)
+        while len(self._texts) > self.capacity:
+            self._texts.popitem(last=False)
+
+    def stats(self):
+        """Hit rate and an estimate of the encode/search time saved by hits"""
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            avg_encode = self._encode_seconds / self._timed_misses if self._timed_misses else 0.0
+            avg_search = self._search_seconds / self._timed_misses if self._timed_misses else 0.0
+            # Exact hits skip encoding and search; semantic hits skip search only
+            saved = self.exact_hits * (avg_encode + avg_search) + self.semantic_hits * avg_search
+            return {
+                "enabled": self.enabled,
+                "capacity": self.capacity,
+                "threshold": self.threshold,
+                "entries": self._count,
+                "lookups": lookups,
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+                "avg_encode_ms": avg_encode * 1000,
+                "avg_search_ms": avg_search * 1000,
+                "saved_compute_ms": saved * 1000,
+            }
@@ -0,0 +1,226 @@
+"""
+Retrieval index helpers for the Veterinary Chatbot API
+Embeddings are kept L2-normalised so cosine similarity is a plain dot product
+"""
+
+import numpy as np
+
+# =====================
+# Index modes
+# =====================
+# question - one vector per dataset row (original behaviour)
+# centroid - one mean vector per distinct answer
+# medoid   - a few real question vectors per distinct answer
+INDEX_MODES = ("question", "centroid", "medoid")
+
+# flat         - score the query against every index vector
+# hierarchical - score per-disease representatives first, then only the
+#                index vectors of the best few diseases
+RETRIEVAL_MODES = ("flat", "hierarchical")
+
+
+def normalize_rows(matrix):
+    """Return a float32 copy of matrix with every row scaled to unit length"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix[None, :]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class CompactEmbeddings:
+    """
+    Reduced-precision (float16 or int8 + per-row scale) embedding matrix.
+    Supports the operations search uses on a float32 ndarray: `@ query`,
+    row indexing, len() and nbytes. Scoring upcasts in fixed-size chunks so
+    the full float32 matrix is never materialised.
+    """
+
+    CHUNK_ROWS = 2048
+
+    def __init__(self, codes, scales=None):
+        self.codes = codes
+        self.scales = scales
+
+    @classmethod
+    def from_float32(cls, matrix, precision):
+        if precision == "float16":
+            return cls(matrix.astype(np.float16))
+        if precision == "int8":
+            scales = np.abs(matrix).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            codes = np.round(matrix / scales[:, None]).astype(np.int8)
+            return cls(codes, scales.astype(np.float32))
+        raise ValueError(f"Unsupported precision '{precision}'")
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def shape(self):
+        return self.codes.shape
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + (0 if self.scales is None else self.scales.nbytes)
+
+    def __getitem__(self, rows):
+        return CompactEmbeddings(self.codes[rows], None if self.scales is None else self.scales[rows])
+
+    def __matmul__(self, query):
+        # query is one vector (dim,) or a matrix of query columns (dim, n_queries)
+        out = np.empty((len(self.codes),) + query.shape[1:], dtype=np.float32)
+        for start in range(0, len(self.codes), self.CHUNK_ROWS):
+            chunk = self.codes[start:start + self.CHUNK_ROWS].astype(np.float32)
+            out[start:start + len(chunk)] = chunk @ query
+        if self.scales is not None:
+            out *= self.scales.reshape((-1,) + (1,) * (query.ndim - 1))
+        return out
+
+
+def compact_embeddings(matrix, precision="float32"):
+    """Return matrix stored at the given precision (float32 returns it unchanged)"""
+    if precision == "float32":
+        return matrix
+    return CompactEmbeddings.from_float32(matrix, precision)
+
+
+def group_rows_by_answer(answers):
+    """
+    Group dataset rows that share the same answer text.
+    Returns (group_ids, groups): group_ids[i] is the group of row i and
+    groups[g] is the list of rows in group g, in first-seen order.
+    """
+    group_of_answer = {}
+    groups = []
+    group_ids = np.empty(len(answers), dtype=np.int32)
+    for row, answer in enumerate(answers):
+        key = answer.strip()
+        g = group_of_answer.get(key)
+        if g is None:
+            g = len(groups)
+            group_of_answer[key] = g
+            groups.append([])
+        groups[g].append(row)
+        group_ids[row] = g
+    return group_ids, groups
+
+
+def _pick_medoids(members, member_embs, centroid, k):
+    """
+    Pick up to k representative rows from a group.
+    The first is the row closest to the centroid; the rest are chosen
+    farthest-first so they cover different phrasings of the question.
+    """
+    sims_to_centroid = member_embs @ centroid
+    chosen = [int(sims_to_centroid.argmax())]
+    while len(chosen) < min(k, len(members)):
+        # Similarity of every member to its nearest already-chosen medoid
+        nearest = (member_embs @ member_embs[chosen].T).max(axis=1)
+        nearest[chosen] = np.inf
+        chosen.append(int(nearest.argmin()))
+    return [members[i] for i in chosen]
+
+
+def build_answer_index(embeddings, answers, mode="centroid", medoids_per_group=2):
+    """
+    Build a compact search index with one or a few vectors per distinct answer.
+
+    embeddings must be row-normalised (see normalize_rows).
+    Returns (index_embeddings, index_rows) where index_rows[j] is the dataset
+    row whose question/answer/disease is returned when index vector j wins.
+    """
+    if mode not in INDEX_MODES:
+        raise ValueError(f"Unknown index mode '{mode}'. Choose one of {INDEX_MODES}")
+
+    if mode == "question":
+        return embeddings, np.arange(len(embeddings), dtype=np.int32)
+
+    _, groups = group_rows_by_answer(answers)
+    vectors = []
+    rows = []
+    for members in groups:
+        member_embs = embeddings[members]
+        centroid = normalize_rows(member_embs.mean(axis=0))[0]
+        if mode == "centroid":
+            # Report the member question closest to the centroid as the match
+            vectors.append(centroid)
+            rows.append(members[int((member_embs @ centroid).argmax())])
+        else:
+            for row in _pick_medoids(members, member_embs, centroid, medoids_per_group):
+                vectors.append(embeddings[row])
+                rows.append(row)
+
+    return np.vstack(vectors).astype(np.float32), np.asarray(rows, dtype=np.int32)
+
+
+def search(query_emb, index_embeddings, top_k=1):
+    """
+    Score a single query embedding against an index.
+    Returns (positions, scores) for the top_k index vectors, best first.
+    """
+    query = normalize_rows(query_emb)[0]
+    scores = index_embeddings @ query
+    top_k = min(top_k, len(scores))
+    if top_k == 1:
+        best = np.array([int(scores.argmax())])
+    else:
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best])]
+    return best, scores[best]
+
+
+def search_batch(query_embs, index_embeddings):
+    """
+    Score many query embeddings against an index with one matrix product.
+    Returns (positions, scores): the best index vector for each query.
+    """
+    queries = normalize_rows(query_embs)
+    scores = index_embeddings @ queries.T
+    best = scores.argmax(axis=0)
+    return best, scores[best, np.arange(len(queries))]
+
+
+# =====================
+# Disease-first (hierarchical) retrieval
+# =====================
+def build_disease_index(index_embeddings, index_diseases):
+    """
+    Group index vectors by disease and compute one representative per disease.
+
+    Returns (disease_names, disease_embeddings, disease_members) where
+    disease_members[d] holds the index positions belonging to disease d.
+    """
+    members_by_disease = {}
+    for pos, disease in enumerate(index_diseases):
+        members_by_disease.setdefault(disease, []).append(pos)
+
+    disease_names = list(members_by_disease)
+    disease_members = [np.asarray(members_by_disease[name], dtype=np.int32) for name in disease_names]
+    disease_embeddings = normalize_rows(
+        np.vstack([index_embeddings[members].mean(axis=0) for members in disease_members])
+    )
+    return disease_names, disease_embeddings, disease_members
+
+
+def hierarchical_search(query_emb, index_embeddings, disease_embeddings, disease_members, top_diseases=3):
+    """
+    Two-stage search: score the query against the per-disease representatives,
+    then only against the index vectors of the top_diseases best diseases.
+
+    Returns (position, score, disease, disease_score) where position is into
+    index_embeddings, disease is the position of the winning vector's disease
+    in disease_embeddings and disease_score is its stage-one similarity.
+    """
+    query = normalize_rows(query_emb)[0]
+    disease_scores = disease_embeddings @ query
+    top_diseases = min(top_diseases, len(disease_scores))
+    shortlist = np.argpartition(-disease_scores, top_diseases - 1)[:top_diseases]
+
+    candidates = np.concatenate([disease_members[d] for d in shortlist])
+    owners = np.concatenate([np.full(len(disease_members[d]), d, dtype=np.int32) for d in shortlist])
+    scores = index_embeddings[candidates] @ query
+    best = int(scores.argmax())
+    disease = int(owners[best])
+    return int(candidates[best]), float(scores[best]), disease, float(disease_scores[disease])
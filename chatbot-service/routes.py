@@ -0,0 +1,331 @@
+"""
+HTTP layer of the Veterinary Chatbot API
+
+app.py (Render) and app_hf.py (Hugging Face Spaces, Docker) create the Flask
+app, CORS and ChatbotEngine with their deploy-specific defaults. Loading and
+every endpoint they serve are shared from here.
+
+Usage:
+    from routes import register_routes, route_settings_from_env, start_engine
+
+    settings = route_settings_from_env()
+    ready = start_engine(engine, timeline, settings["startup_mode"])
+    register_routes(app, engine, admission, timeline, ready, settings)
+"""
+
+import os
+import threading
+import traceback
+
+from flask import Response, jsonify, request
+
+from admission import Rejected, client_key, request_deadline
+from profiling import NothingToSample, ProfilerBusy, collapsed, sample_stacks, token_matches, top_allocations
+
+
+def route_settings_from_env(**defaults):
+    """
+    HTTP settings from environment variables. `defaults` overrides the built-in
+    default of any setting (e.g. startup_mode="background").
+    """
+    def env(name, cast=str):
+        key = name.lower()
+        value = os.environ.get(name)
+        return defaults.get(key, _DEFAULTS[key]) if value is None else cast(value)
+
+    return {
+        # "eager" loads everything before serving; "background" opens the port immediately
+        # and loads in a thread (/chat answers 503 until ready)
+        "startup_mode": env("STARTUP_MODE").lower(),
+        # Most completions /suggest returns
+        "suggest_max_limit": env("SUGGEST_MAX_LIMIT", int),
+        # Most messages one /chat/batch request may carry
+        "chat_batch_max_size": env("CHAT_BATCH_MAX_SIZE", int),
+        # Seconds browsers and CDNs may cache a GET /answer/<id> response
+        "answer_max_age": env("ANSWER_MAX_AGE", int),
+        # /debug/profile and /debug/memory answer 404 unless DEBUG_TOKEN is set and sent
+        # as X-Debug-Token; a profile runs for at most DEBUG_MAX_SECONDS
+        "debug_token": env("DEBUG_TOKEN"),
+        "debug_max_seconds": env("DEBUG_MAX_SECONDS", float),
+    }
+
+
+_DEFAULTS = {
+    "startup_mode": "eager",
+    "suggest_max_limit": 20,
+    "chat_batch_max_size": 64,
+    "answer_max_age": 3600,
+    "debug_token": "",
+    "debug_max_seconds": 20.0,
+}
+
+
+def start_engine(engine, timeline, startup_mode="eager"):
+    """
+    Load the engine now ("eager") or in a thread ("background"). Returns an
+    Event set once loading has finished, successfully or not.
+    """
+    ready = threading.Event()
+
+    def startup():
+        """Load dataset and model, warm up, and record the startup timeline"""
+        try:
+            engine.load()
+            print("✅ Chatbot ready!")
+        except Exception as e:
+            print(f"❌ Initialization failed: {e}")
+            traceback.print_exc()
+            print("⚠️  App will start but chatbot may not work")
+        finally:
+            timeline.mark_ready()
+            ready.set()
+
+    if startup_mode == "background":
+        threading.Thread(target=startup, name="startup", daemon=True).start()
+    else:
+        startup()
+    return ready
+
+
+def register_routes(app, engine, admission, timeline, ready, settings):
+    """Add every API endpoint to the Flask app"""
+    suggest_max_limit = settings["suggest_max_limit"]
+    chat_batch_max_size = settings["chat_batch_max_size"]
+    answer_max_age = settings["answer_max_age"]
+    debug_token = settings["debug_token"]
+    debug_max_seconds = settings["debug_max_seconds"]
+
+    def admit_request():
+        """Admission for this request's model call, keyed on the client and its deadline"""
+        client = client_key(request.remote_addr, request.headers.get("X-Forwarded-For"),
+                            admission.trusted_proxies)
+        deadline = request_deadline(request.headers.get("X-Request-Timeout"), admission.timeout)
+        return lambda questions: admission.admit(client, deadline, questions)
+
+    def shed_response(e):
+        """429/503 with Retry-After for a request turned away by admission control"""
+        return jsonify({
+            "error": str(e),
+            "reason": e.reason,
+            "status": "error"
+        }), e.status_code, {"Retry-After": str(e.retry_after)}
+
+    def not_ready_response():
+        """503 while loading, 500 when loading failed; None once the engine is ready"""
+        if not ready.is_set():
+            return jsonify({
+                "error": "Chatbot is starting up. Please retry shortly.",
+                "status": "error"
+            }), 503
+        if not engine.ready:
+            return jsonify({
+                "error": "Chatbot model is not loaded. Please check server logs.",
+                "status": "error"
+            }), 500
+        return None
+
+    @app.route("/health", methods=["GET"])
+    def health():
+        """Health check endpoint"""
+        return jsonify({
+            "status": "ok",
+            "message": "Chatbot service is running",
+            "model_loaded": engine.embedder is not None,
+            "dataset_loaded": len(engine.questions) > 0,
+            "memory": engine.memory_breakdown(),
+            "startup": timeline.summary()
+        }), 200
+
+    @app.route("/suggest", methods=["GET"])
+    def suggest():
+        """Typeahead completions for a partially typed question (no model call)"""
+        prefix = request.args.get("q", "")
+        language = request.args.get("language", "en")
+        try:
+            limit = min(max(int(request.args.get("limit", "8")), 1), suggest_max_limit)
+        except ValueError:
+            return jsonify({"error": "limit must be an integer", "status": "error"}), 400
+
+        return jsonify({
+            "query": prefix,
+            "language": language,
+            "suggestions": engine.suggest(prefix, language, limit),
+            "status": "success"
+        }), 200
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        """Runtime metrics (query cache hit rate, saved compute and shed requests)"""
+        return jsonify({**engine.metrics(), "admission": admission.stats()}), 200
+
+    @app.route("/chat", methods=["POST"])
+    def chat():
+        """Main chat endpoint - receives messages from your website"""
+        try:
+            data = request.get_json() or {}
+            user_q = data.get("message", "")
+            language = data.get("language", "en")  # Answer language in multilingual mode
+
+            if not user_q or not isinstance(user_q, str) or not user_q.strip():
+                return jsonify({
+                    "error": "Empty message",
+                    "status": "error"
+                }), 400
+
+            not_ready = not_ready_response()
+            if not_ready:
+                return not_ready
+
+            # Cache, disease-name fast path, then encode and search (see engine.py).
+            # "response" holds the main answer for your website; the answer fields are
+            # pre-encoded JSON with the score, status and language spliced in (see payloads.py)
+            body = engine.query_json(user_q, language, admit=admit_request(),
+                                     fields={"status": "success", "language": language})
+
+            return Response(body, mimetype="application/json"), 200
+
+        except Rejected as e:
+            return shed_response(e)
+        except Exception as e:
+            print(f"❌ Error processing chat request: {str(e)}")
+            traceback.print_exc()
+
+            return jsonify({
+                "response": "Sorry, I encountered an error processing your request.",
+                "status": "error",
+                "error": str(e)
+            }), 500
+
+    @app.route("/chat/batch", methods=["POST"])
+    def chat_batch():
+        """
+        Answer several messages in one request (used by chatbot_client.py).
+        Body: {"messages": ["...", {"message": "...", "language": "ta"}], "language": "en"};
+        results keep the order of the messages.
+        """
+        try:
+            data = request.get_json() or {}
+            messages = data.get("messages")
+            default_language = data.get("language", "en")
+
+            if not isinstance(messages, list) or not messages:
+                return jsonify({"error": "messages must be a non-empty list", "status": "error"}), 400
+            if len(messages) > chat_batch_max_size:
+                return jsonify({
+                    "error": f"At most {chat_batch_max_size} messages per batch",
+                    "status": "error"
+                }), 413
+
+            not_ready = not_ready_response()
+            if not_ready:
+                return not_ready
+
+            items = [m if isinstance(m, dict) else {"message": m} for m in messages]
+            languages = [item.get("language") or default_language for item in items]
+            valid = [i for i, item in enumerate(items)
+                     if isinstance(item.get("message"), str) and item["message"].strip()]
+
+            # One batched encode and search for every valid message (see engine.py)
+            hits = engine.query_hits([items[i]["message"] for i in valid], admit=admit_request())
+            results = [b'{"error":"Empty message","status":"error"}'] * len(items)
+            for i, hit in zip(valid, hits):
+                results[i] = engine.result_json(hit, languages[i], {"status": "success", "language": languages[i]})
+
+            body = b'{"results":[' + b",".join(results) + b'],"status":"success"}'
+            return Response(body, mimetype="application/json"), 200
+
+        except Rejected as e:
+            return shed_response(e)
+        except Exception as e:
+            print(f"❌ Error processing chat batch: {str(e)}")
+            traceback.print_exc()
+            return jsonify({"error": str(e), "status": "error"}), 500
+
+    @app.route("/answer/<int:answer_id>", methods=["GET"])
+    def answer(answer_id):
+        """Static answer record by the "answer_id" of a /chat result; cacheable with ETag"""
+        payloads = engine.payloads
+        if payloads is None:
+            return jsonify({"error": "Chatbot is starting up. Please retry shortly.", "status": "error"}), 503
+        # answer_id is the dataset file row; this worker may not have loaded it
+        row = payloads.row_of(answer_id)
+        if row is None:
+            return jsonify({"error": "Unknown answer id", "status": "error"}), 404
+
+        gzipped = request.accept_encodings["gzip"] > 0
+        response = Response(payloads.gzipped(row) if gzipped else payloads.record(row),
+                            mimetype="application/json")
+        if gzipped:
+            response.headers["Content-Encoding"] = "gzip"
+        response.headers["Vary"] = "Accept-Encoding"
+        response.cache_control.public = True
+        response.cache_control.max_age = answer_max_age
+        response.set_etag(payloads.etag(row) + ("-gz" if gzipped else ""))
+        # 304 Not Modified when If-None-Match carries the ETag
+        return response.make_conditional(request)
+
+    def debug_denied():
+        """404 unless profiling is enabled and the caller sent the right X-Debug-Token"""
+        if not token_matches(request.headers.get("X-Debug-Token"), debug_token):
+            return jsonify({"error": "Not found", "status": "error"}), 404
+        return None
+
+    @app.route("/debug/profile", methods=["GET"])
+    def debug_profile():
+        """Collapsed stacks of this worker's threads over ?seconds=N, for flamegraphs"""
+        denied = debug_denied()
+        if denied:
+            return denied
+        try:
+            seconds = min(max(float(request.args.get("seconds", "5")), 0.0), debug_max_seconds)
+            interval = max(float(request.args.get("interval_ms", "5")), 1.0) / 1000
+        except ValueError:
+            return jsonify({"error": "seconds and interval_ms must be numbers", "status": "error"}), 400
+
+        try:
+            counts, rounds = sample_stacks(seconds, interval, include_idle=request.args.get("idle") == "1")
+        except (ProfilerBusy, NothingToSample) as e:
+            return jsonify({"error": str(e), "status": "error"}), 409
+        return Response(collapsed(counts), mimetype="text/plain", headers={"X-Profile-Samples": str(rounds)})
+
+    @app.route("/debug/memory", methods=["GET"])
+    def debug_memory():
+        """Top allocating source lines (tracemalloc) over ?seconds=N"""
+        denied = debug_denied()
+        if denied:
+            return denied
+        try:
+            seconds = min(max(float(request.args.get("seconds", "10")), 0.0), debug_max_seconds)
+            limit = min(max(int(request.args.get("limit", "20")), 1), 100)
+            frames = min(max(int(request.args.get("frames", "1")), 1), 25)
+        except ValueError:
+            return jsonify({"error": "seconds, limit and frames must be numbers", "status": "error"}), 400
+
+        try:
+            report = top_allocations(seconds, limit, frames)
+        except ProfilerBusy as e:
+            return jsonify({"error": str(e), "status": "error"}), 409
+        return jsonify({**report, "status": "success"}), 200
+
+    @app.route("/", methods=["GET"])
+    def index():
+        """Root endpoint"""
+        return jsonify({
+            "service": "Veterinary Chatbot API",
+            "status": "running",
+            "model": engine.model_name,
+            "dataset_size": len(engine.questions),
+            "index_mode": engine.index_mode,
+            "index_precision": engine.index_precision,
+            "index_size": 0 if engine.index_rows is None else len(engine.index_rows),
+            "retrieval_mode": engine.retrieval_mode,
+            "multilingual": engine.multilingual,
+            "endpoints": {
+                "health": "/health",
+                "chat": "/chat (POST)",
+                "chat_batch": "/chat/batch (POST)",
+                "answer": "/answer/<answer_id>",
+                "suggest": "/suggest?q=<prefix>&language=<en|ta|ml|hi>",
+                "metrics": "/metrics"
+            }
+        }), 200
@@ -0,0 +1,49 @@
+"""
+Startup timeline for the Veterinary Chatbot API
+Records how long each cold-start phase takes so regressions show up in logs and /health
+"""
+
+import time
+from contextlib import contextmanager
+
+
+class StartupTimeline:
+    """Named phases measured from `origin` (a time.perf_counter() value)"""
+
+    def __init__(self, origin=None):
+        self.origin = time.perf_counter() if origin is None else origin
+        self.phases = []
+        self.notes = {}
+        self.ready_at = None
+
+    def record(self, name, start, end):
+        self.phases.append({
+            "phase": name,
+            "start_s": round(start - self.origin, 3),
+            "duration_s": round(end - start, 3),
+        })
+        print(f"⏱️  {name}: {end - start:.2f}s")
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter())
+
+    def note(self, key, value):
+        """Attach a measurement (e.g. encoding throughput) to the timeline"""
+        self.notes[key] = value
+
+    def mark_ready(self):
+        self.ready_at = time.perf_counter()
+        print(f"⏱️  ready after {self.ready_at - self.origin:.2f}s")
+
+    def summary(self):
+        return {
+            "phases": list(self.phases),
+            "notes": dict(self.notes),
+            "ready": self.ready_at is not None,
+            "total_s": None if self.ready_at is None else round(self.ready_at - self.origin, 3),
+        }
@@ -0,0 +1,132 @@
+"""
+Typeahead suggestions for the Veterinary Chatbot API
+
+A sorted array of normalised keys per language, searched with bisect: the
+keys starting with a prefix form one contiguous range, and the best entries
+of that range are picked by a precomputed priority. No model is involved, so
+a lookup takes microseconds.
+
+Entries are dataset questions (matched from their start) and disease names
+from the dataset and the name tables (matched from the start of any word, so
+"pox" finds "Fowl Pox"). Disease names rank before questions, diseases with
+more rows first, shorter questions first.
+"""
+
+from bisect import bisect_left
+
+import numpy as np
+
+from multilingual import LANGUAGES, collection_language
+from query_cache import normalize_query
+
+DISEASE, QUESTION = "disease", "question"
+_KIND_ORDER = {DISEASE: 0, QUESTION: 1}
+
+
+class PrefixIndex:
+    """Ranked prefix completions over one language's texts"""
+
+    def __init__(self):
+        self._pending = {}  # (key, text) -> (not at start, kind order, -weight, kind)
+        self._keys = []
+        self._texts = []
+        self._kinds = []
+        self._priority = np.zeros(0, dtype=np.int32)
+
+    def add(self, text, kind, weight=0, word_starts=False):
+        """Index text by its start (and the start of every later word if word_starts)"""
+        text = text.strip().rstrip(":").strip()
+        key = normalize_query(text)
+        if not key:
+            return
+        words = key.split(" ")
+        starts = range(len(words)) if word_starts else range(1)
+        for i in starts:
+            entry = (" ".join(words[i:]), text)
+            rank = (i > 0, _KIND_ORDER[kind], -weight)
+            previous = self._pending.get(entry)
+            if previous is None or rank < previous[:3]:
+                self._pending[entry] = rank + (kind,)
+
+    def build(self):
+        """Sort the keys and compute each entry's rank within any prefix range"""
+        entries = sorted(self._pending.items())
+        self._keys = [key for (key, _), _ in entries]
+        self._texts = [text for (_, text), _ in entries]
+        self._kinds = [rank[3] for _, rank in entries]
+        order = sorted(
+            range(len(entries)),
+            key=lambda i: entries[i][1][:3] + (len(self._texts[i]), self._texts[i]),
+        )
+        self._priority = np.empty(len(entries), dtype=np.int32)
+        self._priority[order] = np.arange(len(entries), dtype=np.int32)
+        self._pending = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def complete(self, prefix, limit=8):
+        """Best `limit` distinct texts whose key starts with the normalised prefix"""
+        key = normalize_query(prefix)
+        if not key or limit <= 0:
+            return []
+        lo = bisect_left(self._keys, key)
+        # Every key starting with `key` sorts before key + the highest code point
+        hi = bisect_left(self._keys, key + "\U0010ffff", lo)
+        if lo == hi:
+            return []
+
+        priority = self._priority[lo:hi]
+        # A text can be reached through several words and spellings; over-fetch
+        # to dedupe, and rank the whole range if that was not enough
+        take = limit * 4
+        if take < len(priority):
+            results = self._ranked(lo, np.argpartition(priority, take - 1)[:take], limit)
+            if len(results) == limit:
+                return results
+        return self._ranked(lo, np.arange(len(priority)), limit)
+
+    def _ranked(self, lo, candidates, limit):
+        candidates = candidates[np.argsort(self._priority[lo + candidates])]
+        results, seen = [], set()
+        for i in candidates:
+            text = self._texts[lo + i]
+            # Spellings that differ only in case or punctuation are one suggestion
+            normalized = normalize_query(text)
+            if normalized not in seen:
+                seen.add(normalized)
+                results.append({"text": text, "type": self._kinds[lo + i]})
+                if len(results) == limit:
+                    break
+        return results
+
+
+def build_suggest_index(questions, diseases, row_collections, name_entries=None):
+    """
+    Build one PrefixIndex per language from the dataset (and optionally the
+    disease name tables). Returns {language: PrefixIndex}.
+    """
+    indexes = {}
+
+    def index_for(language):
+        if language not in indexes:
+            indexes[language] = PrefixIndex()
+        return indexes[language]
+
+    disease_rows = {}
+    for question, disease, collection in zip(questions, diseases, row_collections):
+        language = collection_language(collection)
+        index_for(language).add(question, QUESTION)
+        disease_rows[(language, disease)] = disease_rows.get((language, disease), 0) + 1
+    for (language, disease), count in disease_rows.items():
+        if disease != "Unknown":
+            index_for(language).add(disease, DISEASE, weight=count, word_starts=True)
+
+    for entry in name_entries or []:
+        for language, name in entry.get("names", {}).items():
+            if name and language in LANGUAGES:
+                index_for(language).add(name, DISEASE, word_starts=True)
+
+    for index in indexes.values():
+        index.build()
+    return indexes
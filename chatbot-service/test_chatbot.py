@@ -3,19 +3,22 @@ Quick test script for the chatbot
 Run this to test if your chatbot is working
 """
 
-import requests
 import json
+from concurrent.futures import ThreadPoolExecutor
+
+from chatbot_client import ChatbotClient
 
 CHATBOT_URL = "http://localhost:5002"
 
+client = ChatbotClient(CHATBOT_URL)
+
 def test_health():
     """Test health endpoint"""
     print("Testing health endpoint...")
     try:
-        response = requests.get(f"{CHATBOT_URL}/health")
-        print(f"Status: {response.status_code}")
-        print(f"Response: {json.dumps(response.json(), indent=2)}")
-        return response.status_code == 200
+        response = client.health()
+        print(f"Response: {json.dumps(response, indent=2)}")
+        return True
     except Exception as e:
         print(f"Error: {e}")
         return False
@@ -24,14 +27,22 @@ def test_chat(message):
     """Test chat endpoint"""
     print(f"\nTesting chat with message: '{message}'")
     try:
-        response = requests.post(
-            f"{CHATBOT_URL}/chat",
-            json={"message": message, "language": "en"},
-            timeout=30
-        )
-        print(f"Status: {response.status_code}")
-        print(f"Response: {json.dumps(response.json(), indent=2)}")
-        return response.status_code == 200
+        response = client.ask(message, language="en")
+        print(f"Response: {json.dumps(response, indent=2)}")
+        return True
+    except Exception as e:
+        print(f"Error: {e}")
+        return False
+
+def test_concurrent_chat(messages):
+    """Test concurrent questions (coalesced into /chat/batch requests)"""
+    print(f"\nTesting {len(messages)} concurrent questions...")
+    try:
+        with ThreadPoolExecutor(max_workers=len(messages)) as pool:
+            responses = list(pool.map(client.ask, messages))
+        for message, response in zip(messages, responses):
+            print(f"  {message!r} -> {response.get('detected_disease')} ({response.get('similarity_score')})")
+        return True
     except Exception as e:
         print(f"Error: {e}")
         return False
@@ -40,22 +51,29 @@ if __name__ == "__main__":
     print("=" * 60)
     print("Chatbot Test Script")
     print("=" * 60)
-    
+
     # Test health
     if test_health():
         print("\n✅ Health check passed!")
     else:
         print("\n❌ Health check failed!")
         exit(1)
-    
+
     # Test chat
     if test_chat("What is mastitis?"):
         print("\n✅ Chat test passed!")
     else:
         print("\n❌ Chat test failed!")
         exit(1)
-    
+
+    # Test concurrent chat
+    if test_concurrent_chat(["What is mastitis?", "How to treat fowl pox?", "Bloat in goats", "Foot and mouth disease"]):
+        print("\n✅ Concurrent chat test passed!")
+    else:
+        print("\n❌ Concurrent chat test failed!")
+        exit(1)
+
+    client.close()
     print("\n" + "=" * 60)
     print("All tests passed! ✅")
     print("=" * 60)
-
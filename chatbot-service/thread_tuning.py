@@ -0,0 +1,195 @@
+"""
+CPU thread tuning and warm-up for the query encoder
+
+torch gives every process one intra-op thread per core. With several gunicorn
+workers on one host their thread pools oversubscribe the cores, and the first
+encode after boot pays for lazy initialisation (thread pools, tokenizer
+caches, kernel selection). At startup the engine:
+
+1. before the model loads, caps torch's intra-op threads at this worker's
+   share of the cores (cores / web workers, where cores honour the CPU
+   affinity mask and a container CPU quota) and its inter-op pool at 1;
+2. once the index is built, encodes representative dataset questions (spread
+   over the question-length range) to warm the tokenizer and model;
+3. times single-question encodes at each candidate thread count up to the
+   share and keeps the fastest, preferring fewer threads within 5%;
+4. logs the chosen configuration next to the latency at torch's default.
+
+THREAD_TUNING=auto (default) does all of this, a number fixes the intra-op
+threads and skips step 3, and off leaves torch's defaults and only warms up.
+Web workers are read from WEB_CONCURRENCY (gunicorn's own default) or from
+gunicorn's --workers/-w option.
+"""
+
+import math
+import os
+import statistics
+import sys
+import time
+
+THREAD_TUNING_MODES = ("auto", "off")
+
+# Fewer threads win unless more are at least this much faster
+_TOLERANCE = 1.05
+
+
+def _cgroup_cpus():
+    """CPU quota of the container in cores (cgroup v2, then v1), or None when unlimited"""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def available_cores():
+    """Cores this process may run on: the affinity mask, capped by a container CPU quota"""
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+    quota = _cgroup_cpus()
+    if quota:
+        cores = min(cores, max(1, math.ceil(quota)))
+    return cores
+
+
+def web_workers(argv=None):
+    """Web worker processes sharing the host: WEB_CONCURRENCY, gunicorn's --workers/-w, else 1"""
+    value = os.environ.get("WEB_CONCURRENCY")
+    argv = sys.argv if argv is None else argv
+    if not value and argv and "gunicorn" in os.path.basename(argv[0]):
+        for i, arg in enumerate(argv):
+            if arg in ("-w", "--workers") and i + 1 < len(argv):
+                value = argv[i + 1]
+            elif arg.startswith("--workers="):
+                value = arg.split("=", 1)[1]
+            elif arg.startswith("-w") and arg[2:].isdigit():
+                value = arg[2:]
+    try:
+        return max(1, int(value)) if value else 1
+    except ValueError:
+        return 1
+
+
+def thread_candidates(share):
+    """Powers of two below the per-worker share, and the share itself"""
+    candidates = {share}
+    n = 1
+    while n < share:
+        candidates.add(n)
+        n *= 2
+    return sorted(candidates)
+
+
+def representative_queries(questions, n=16):
+    """Up to n distinct dataset questions spread evenly over the question-length range"""
+    unique = sorted(set(questions), key=len)
+    if len(unique) <= n:
+        return unique
+    step = (len(unique) - 1) / (n - 1)
+    return [unique[round(i * step)] for i in range(n)]
+
+
+def median_latency(encode, queries, repeats=2):
+    """Median seconds per single-question encode over `repeats` passes"""
+    timings = []
+    for _ in range(repeats):
+        for query in queries:
+            start = time.perf_counter()
+            encode(query)
+            timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def prepare_threads(mode="auto"):
+    """
+    Apply the per-worker thread cap before the model loads. mode is "auto",
+    "off" or a fixed intra-op thread count. Returns the plan for tune_threads.
+    """
+    import torch
+
+    if mode not in THREAD_TUNING_MODES and not str(mode).isdigit():
+        raise ValueError(f"Unknown THREAD_TUNING '{mode}'. Choose one of {THREAD_TUNING_MODES} or a thread count")
+    cores, workers = available_cores(), web_workers()
+    plan = {
+        "mode": mode,
+        "cores": cores,
+        "web_workers": workers,
+        "share": max(1, cores // workers),
+        "default_threads": torch.get_num_threads(),
+        "interop_threads": torch.get_num_interop_threads(),
+    }
+    if mode == "off":
+        plan["threads"] = plan["default_threads"]
+        return plan
+
+    plan["threads"] = plan["share"] if mode == "auto" else max(1, int(mode))
+    torch.set_num_threads(plan["threads"])
+    try:
+        torch.set_num_interop_threads(1)
+        plan["interop_threads"] = 1
+    except RuntimeError:
+        pass  # the inter-op pool has already started in this process; keep it
+    return plan
+
+
+def tune_threads(encode, queries, plan, repeats=2):
+    """
+    Warm the tokenizer and model on `queries`, then settle the intra-op thread
+    count (calibrated in "auto" mode). Returns a report with the chosen threads
+    and median query latencies at torch's default and at the chosen count.
+    """
+    import torch
+
+    report = dict(plan)
+    start = time.perf_counter()
+    encode(queries[0])
+    report["cold_first_query_ms"] = (time.perf_counter() - start) * 1000
+    for query in queries:
+        encode(query)
+    report["warmup_queries"] = len(queries)
+
+    timings = {}
+    if plan["mode"] != "off":
+        torch.set_num_threads(plan["default_threads"])
+        timings[plan["default_threads"]] = median_latency(encode, queries, repeats)
+    if plan["mode"] == "auto":
+        for threads in thread_candidates(plan["share"]):
+            if threads not in timings:
+                torch.set_num_threads(threads)
+                timings[threads] = median_latency(encode, queries, repeats)
+        best = min(timings[n] for n in thread_candidates(plan["share"]))
+        threads = min(n for n in thread_candidates(plan["share"]) if timings[n] <= best * _TOLERANCE)
+        report["candidates_ms"] = {str(n): round(t * 1000, 2) for n, t in sorted(timings.items())}
+    else:
+        threads = plan["threads"]
+    torch.set_num_threads(threads)
+    if threads not in timings:
+        timings[threads] = median_latency(encode, queries, repeats)
+
+    report["threads"] = threads
+    report["default_ms"] = timings.get(plan["default_threads"], timings[threads]) * 1000
+    report["tuned_ms"] = timings[threads] * 1000
+    return report
+
+
+def describe(report):
+    """One log line for a tune_threads report"""
+    return (f"🧵 Threads ({report['mode']}): {report['cores']} core(s), {report['web_workers']} web worker(s) → "
+            f"intra-op {report['threads']}, inter-op {report['interop_threads']}; "
+            f"median query {report['default_ms']:.1f} ms at torch default ({report['default_threads']}) → "
+            f"{report['tuned_ms']:.1f} ms; cold first query {report['cold_first_query_ms']:.0f} ms")
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Bulk MongoDB loader for the extracted disease name tables.
+
+Streams disease entries ({"id", "category", "names"}) into the translation
+collections (translationPoultryBirds, translationCowAndBuffalo,
+translationSheepGoat) with ordered bulk upserts keyed on (category, id).
+Entries are buffered per collection and written batch_size at a time. Before
+each write the batch's existing documents are read in one query, so unchanged
+entries are skipped and only new or changed ones are written.
+
+Works with any pymongo-compatible database object: a real one from
+MongoClient, or an in-memory stand-in such as mongomock for tests:
+
+    import mongomock
+    loader = DiseaseNameLoader(mongomock.MongoClient().Diseases, batch_size=2)
+    loader.load(entries)
+
+It can also load the JSON files written by process_disease_names.py:
+
+    python disease_names_loader.py --mongodb-uri "$MONGODB_URI" cowAndBuffalo.json poultryBirds.json sheepGoat.json
+"""
+
+import argparse
+import json
+import os
+import time
+
+from pymongo import ASCENDING, UpdateOne
+
+# Category -> translation collection (see DISEASE_TRANSLATION_IMPLEMENTATION.md)
+TRANSLATION_COLLECTIONS = {
+    "PoultryBirds": "translationPoultryBirds",
+    "CowAndBuffalo": "translationCowAndBuffalo",
+    "SheepGoat": "translationSheepGoat",
+}
+
+DEFAULT_DATABASE = "Diseases"
+
+
+class DiseaseNameLoader:
+    """Ordered, change-only bulk upserts of disease entries keyed on (category, id)"""
+
+    def __init__(self, db, batch_size=100, collections=None, ensure_indexes=True):
+        self.db = db
+        self.batch_size = max(1, batch_size)
+        self.collections = collections or TRANSLATION_COLLECTIONS
+        self.ensure_indexes = ensure_indexes
+        self._pending = {}
+        self._indexed = set()
+        self._start = None
+        self.stats = {}
+
+    def add(self, entry):
+        """Queue one entry; writes its collection's batch once it is full"""
+        if self._start is None:
+            self._start = time.perf_counter()
+        name = self.collections.get(entry["category"])
+        if name is None:
+            raise ValueError(f"Unknown category '{entry['category']}'. Choose one of {list(self.collections)}")
+        batch = self._pending.setdefault(name, [])
+        batch.append(entry)
+        if len(batch) >= self.batch_size:
+            self._write(name, batch)
+            self._pending[name] = []
+
+    def flush(self):
+        """Write every partial batch"""
+        for name, batch in self._pending.items():
+            if batch:
+                self._write(name, batch)
+        self._pending = {}
+
+    def load(self, entries):
+        """Upsert all entries (any iterable, consumed lazily); returns the stats"""
+        for entry in entries:
+            self.add(entry)
+        self.flush()
+        return self.stats
+
+    def _write(self, name, batch):
+        collection = self.db[name]
+        if self.ensure_indexes and name not in self._indexed:
+            collection.create_index([("category", ASCENDING), ("id", ASCENDING)], unique=True)
+            self._indexed.add(name)
+
+        stats = self.stats.setdefault(name, {
+            "received": 0, "inserted": 0, "updated": 0, "unchanged": 0, "batches": 0, "seconds": 0.0,
+        })
+        start = time.perf_counter()
+
+        # One read per batch tells which entries are new or changed
+        existing = {}
+        for category in {e["category"] for e in batch}:
+            ids = [e["id"] for e in batch if e["category"] == category]
+            for doc in collection.find({"category": category, "id": {"$in": ids}}, {"_id": 0}):
+                existing[(doc["category"], doc["id"])] = doc
+
+        operations = []
+        latest = {}
+        for entry in batch:
+            latest[(entry["category"], entry["id"])] = entry
+        for key, entry in latest.items():
+            doc = existing.get(key)
+            if doc is not None and all(doc.get(field) == value for field, value in entry.items()):
+                stats["unchanged"] += 1
+                continue
+            operations.append(UpdateOne(
+                {"category": entry["category"], "id": entry["id"]}, {"$set": entry}, upsert=True
+            ))
+
+        if operations:
+            result = collection.bulk_write(operations, ordered=True)
+            stats["inserted"] += result.upserted_count
+            stats["updated"] += result.modified_count
+            stats["batches"] += 1
+        stats["received"] += len(batch)
+        stats["seconds"] += time.perf_counter() - start
+
+    def report(self):
+        """Print per-collection counts and write throughput"""
+        total = time.perf_counter() - self._start if self._start is not None else 0.0
+        for name, stats in sorted(self.stats.items()):
+            written = stats["inserted"] + stats["updated"]
+            rate = stats["received"] / stats["seconds"] if stats["seconds"] > 0 else 0.0
+            print(f"✅ {name}: {stats['received']} entries, {stats['inserted']} inserted, "
+                  f"{stats['updated']} updated, {stats['unchanged']} unchanged "
+                  f"({written} written in {stats['batches']} batch(es), {rate:.0f} entries/sec in MongoDB)")
+        received = sum(s["received"] for s in self.stats.values())
+        if total > 0:
+            print(f"   {received} entries loaded in {total:.2f}s ({received / total:.0f} entries/sec overall)")
+
+
+def connect(uri, database=None):
+    """Database handle for a MongoDB URI (the URI's own database, else Diseases)"""
+    from pymongo import MongoClient
+    client = MongoClient(uri)
+    if database:
+        return client[database]
+    return client.get_default_database(DEFAULT_DATABASE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="+", help="Disease name JSON files written by process_disease_names.py")
+    parser.add_argument("--mongodb-uri", default=os.environ.get("MONGODB_URI"),
+                        help="MongoDB connection string (default: $MONGODB_URI)")
+    parser.add_argument("--database", help="Database name (default: the one in the URI, else Diseases)")
+    parser.add_argument("--batch-size", type=int, default=100, help="Upserts per bulk write")
+    args = parser.parse_args()
+
+    if not args.mongodb_uri:
+        parser.error("--mongodb-uri or MONGODB_URI is required")
+
+    def entries():
+        for path in args.files:
+            with open(path, "r", encoding="utf-8") as f:
+                yield from json.load(f)
+
+    loader = DiseaseNameLoader(connect(args.mongodb_uri, args.database), batch_size=args.batch_size)
+    loader.load(entries())
+    loader.report()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,19 @@
 """
 Extract disease names from .docx files organized in language folders.
 Matches diseases across languages and generates JSON files for MongoDB.
+
+With --mongodb-uri (or MONGODB_URI) each disease is also streamed into the
+translation collections as it is extracted, with ordered bulk upserts keyed
+on (category, id) (see disease_names_loader.py):
+
+    python process_disease_names.py --mongodb-uri "$MONGODB_URI" --batch-size 50
 """
 
+import argparse
 import json
 import os
 import re
+import sys
 from pathlib import Path
 from collections import defaultdict
 
@@ -199,8 +207,11 @@ def extract_disease_from_file_group(file_group, category, disease_id):
     return disease_entry
 
 
-def process_category(category):
-    """Process a single category and extract all diseases."""
+def process_category(category, loader=None):
+    """
+    Process a single category and extract all diseases.
+    Each disease is handed to the MongoDB loader (if any) as soon as it is extracted.
+    """
     print(f"\n{'='*60}")
     print(f"📂 Processing Category: {category}")
     print(f"{'='*60}")
@@ -222,14 +233,38 @@ def process_category(category):
         print(f"   Disease {group_idx}:")
         disease_entry = extract_disease_from_file_group(file_group, category, disease_id)
         diseases.append(disease_entry)
+        if loader is not None:
+            loader.add(disease_entry)
         disease_id += 1
     
     print(f"\n   ✅ Extracted {len(diseases)} diseases for {category}")
     return diseases
 
 
+def create_loader(mongodb_uri, database, batch_size):
+    """MongoDB loader for the translation collections, or None when no URI is given."""
+    if not mongodb_uri:
+        return None
+    try:
+        from disease_names_loader import DiseaseNameLoader, connect
+    except ImportError:
+        print("❌ Error: pymongo not found (needed for --mongodb-uri).")
+        print("   Install it with: pip install pymongo")
+        sys.exit(1)
+    db = connect(mongodb_uri, database)
+    print(f"🗄️  Streaming diseases into MongoDB database '{db.name}' (batch size {batch_size})")
+    return DiseaseNameLoader(db, batch_size=batch_size)
+
+
 def main():
     """Main processing function."""
+    parser = argparse.ArgumentParser(description="Extract disease names and generate the translation tables")
+    parser.add_argument("--mongodb-uri", default=os.environ.get("MONGODB_URI"),
+                        help="Also upsert the diseases into MongoDB (default: $MONGODB_URI)")
+    parser.add_argument("--database", help="Database name (default: the one in the URI, else Diseases)")
+    parser.add_argument("--batch-size", type=int, default=100, help="Upserts per MongoDB bulk write")
+    args = parser.parse_args()
+
     print("🚀 Starting Disease Name Extraction")
     print(f"📁 Base path: {BASE_PATH}")
     
@@ -252,14 +287,23 @@ def main():
             print(f"   - {folder}")
         print("\n   Continuing with available folders...\n")
     
+    loader = create_loader(args.mongodb_uri, args.database, args.batch_size)
+    
     # Process each category
     categories = ["PoultryBirds", "CowAndBuffalo", "SheepGoat"]
     all_results = {}
     
     for category in categories:
-        diseases = process_category(category)
+        diseases = process_category(category, loader)
         all_results[category] = diseases
     
+    if loader is not None:
+        loader.flush()
+        print(f"\n{'='*60}")
+        print("🗄️  MongoDB upserts")
+        print(f"{'='*60}\n")
+        loader.report()
+    
     # Generate output files
     print(f"\n{'='*60}")
     print("📝 Generating JSON files...")
@@ -272,14 +316,17 @@ def main():
     }
     
     script_dir = Path(__file__).parent
+    # The chatbot service reads the tables from its data/ folder (multilingual mode)
+    output_dirs = [script_dir, script_dir / "chatbot-service" / "data"]
     
     for category, output_filename in output_files.items():
         if category in all_results and all_results[category]:
-            output_path = script_dir / output_filename
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(all_results[category], f, ensure_ascii=False, indent=2)
+            for output_dir in output_dirs:
+                output_path = output_dir / output_filename
+                with open(output_path, 'w', encoding='utf-8') as f:
+                    json.dump(all_results[category], f, ensure_ascii=False, indent=2)
             print(f"✅ Generated: {output_filename}")
-            print(f"   - Location: {output_path}")
+            print(f"   - Location: {', '.join(str(d / output_filename) for d in output_dirs)}")
             print(f"   - Diseases: {len(all_results[category])}")
         else:
             print(f"⚠️  No data for {category}, skipping {output_filename}")
@@ -0,0 +1,72 @@
+"""
+Tests for disease_names_loader.py against an in-memory MongoDB (mongomock)
+
+    pip install -r requirements_test.txt
+    python -m pytest test_disease_names_loader.py
+"""
+
+import copy
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+from disease_names_loader import DiseaseNameLoader
+
+ENTRIES = [
+    {"id": 1, "category": "PoultryBirds", "names": {"en": "Fowl Pox", "ta": "கோழி அம்மை"}},
+    {"id": 2, "category": "PoultryBirds", "names": {"en": "Ranikhet Disease", "ta": "ராணிக்கெட் நோய்"}},
+    {"id": 3, "category": "PoultryBirds", "names": {"en": "Coccidiosis", "ta": "இரத்தக் கழிச்சல்"}},
+    {"id": 1, "category": "CowAndBuffalo", "names": {"en": "Mastitis", "ta": "மடி வீக்கம்"}},
+    {"id": 2, "category": "CowAndBuffalo", "names": {"en": "Foot and Mouth Disease", "ta": "கோமாரி நோய்"}},
+    {"id": 1, "category": "SheepGoat", "names": {"en": "Bloat", "ta": "வயிறு உப்புசம்"}},
+]
+
+
+def totals(stats):
+    keys = ("received", "inserted", "updated", "unchanged")
+    return {key: sum(s[key] for s in stats.values()) for key in keys}
+
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient().Diseases
+
+
+def test_first_load_inserts_everything(db):
+    stats = DiseaseNameLoader(db, batch_size=2).load(ENTRIES)
+
+    assert totals(stats) == {"received": 6, "inserted": 6, "updated": 0, "unchanged": 0}
+    assert db.translationPoultryBirds.count_documents({}) == 3
+    assert db.translationCowAndBuffalo.count_documents({}) == 2
+    assert db.translationSheepGoat.count_documents({}) == 1
+    doc = db.translationCowAndBuffalo.find_one({"category": "CowAndBuffalo", "id": 1}, {"_id": 0})
+    assert doc == ENTRIES[3]
+
+
+def test_reload_writes_nothing(db):
+    DiseaseNameLoader(db, batch_size=2).load(ENTRIES)
+    stats = DiseaseNameLoader(db, batch_size=2).load(copy.deepcopy(ENTRIES))
+
+    assert totals(stats) == {"received": 6, "inserted": 0, "updated": 0, "unchanged": 6}
+    assert sum(s["batches"] for s in stats.values()) == 0
+
+
+def test_edited_entry_updates_one_document(db):
+    DiseaseNameLoader(db, batch_size=2).load(ENTRIES)
+    edited = copy.deepcopy(ENTRIES)
+    edited[1]["names"]["ta"] = "வெள்ளைக் கழிச்சல்"
+
+    stats = DiseaseNameLoader(db, batch_size=2).load(edited)
+
+    assert totals(stats) == {"received": 6, "inserted": 0, "updated": 1, "unchanged": 5}
+    assert db.translationPoultryBirds.count_documents({}) == 3
+    doc = db.translationPoultryBirds.find_one({"category": "PoultryBirds", "id": 2})
+    assert doc["names"]["ta"] == "வெள்ளைக் கழிச்சல்"
+
+
+def test_unique_index_on_category_and_id(db):
+    DiseaseNameLoader(db).load(ENTRIES)
+
+    indexes = db.translationPoultryBirds.index_information().values()
+    assert any(index.get("unique") and index["key"] == [("category", 1), ("id", 1)] for index in indexes)